@@ -1,10 +1,26 @@
-from flask import Flask, request, Response, send_file, jsonify, session, redirect, url_for, render_template_string
-import google.generativeai as genai
+from flask import Flask, request, Response, jsonify, session, redirect, url_for, render_template_string
+import click
+import codecs
 import re
 import json
 import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from functools import wraps
+from gemini_client import gemini_clients, rate_limiter, model_scheduler, hedger, sdk, ModelRequest, client_for, deadline_for, run_model_steps
+from result_cache import ResultCache, make_key, normalize_sentence
+from lexicon import Lexicon
+from paid_emails import PaidEmailFile, PaidEmailDatabase
+from singleflight import SingleFlight
+from jobs import JobStore, UNFINISHED_JOB_STATES
+from prefetch import Prefetcher
+from assets import AssetStore, gzip_stream, negotiate_encoding
+from history import HistoryStore
+from languages import get_language_name, has_non_latin_letters
+import metrics
+import transliteration
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'lingualens_secret_key')  # Set a secret key for sessions
@@ -12,24 +28,193 @@ app.secret_key = os.environ.get('SECRET_KEY', 'lingualens_secret_key')  # Set a
 # File to store paid email addresses
 PAID_EMAILS_FILE = 'paid_emails.txt'
 
+# Gemini model used for all requests
+MODEL_NAME = os.environ.get('LINGUALENS_MODEL', 'gemini-2.5-pro-exp-03-25')
+
+# Import the Gemini SDK in the background while the rest starts up; /ready
+# answers 503 until it is loaded. With 0 it is imported by the first request.
+PRELOAD_SDK = os.environ.get('LINGUALENS_PRELOAD_SDK', '1') != '0'
+if PRELOAD_SDK:
+    sdk.preload()
+
+# Model per pipeline stage; None keeps the caller's model (LINGUALENS_MODEL).
+# Batched sentences use the sentence model, grammar prefetches the grammar model.
+STAGE_MODELS = {
+    'romanization': os.environ.get('LINGUALENS_ROMANIZATION_MODEL') or None,
+    'sentence': os.environ.get('LINGUALENS_SENTENCE_MODEL') or None,
+    'word_fallback': os.environ.get('LINGUALENS_WORD_FALLBACK_MODEL') or None,
+    'grammar': os.environ.get('LINGUALENS_GRAMMAR_MODEL') or None,
+}
+
+# Short, simple sentences try this faster model first and escalate to the
+# sentence model when its answer fails validation; empty disables the fast tier
+FAST_MODEL = os.environ.get('LINGUALENS_FAST_MODEL', '')
+FAST_MAX_WORDS = int(os.environ.get('LINGUALENS_FAST_MAX_WORDS', '12'))
+FAST_MAX_CHARS = int(os.environ.get('LINGUALENS_FAST_MAX_CHARS', '80'))
+routing_stats = {'fast_accepted': 0, 'escalations': 0}
+routing_stats_lock = threading.Lock()
+
+# Sentence pipeline settings for /process
+DEFAULT_CONCURRENCY = int(os.environ.get('LINGUALENS_CONCURRENCY', '4'))  # Sentences in flight per request
+MAX_CONCURRENCY = int(os.environ.get('LINGUALENS_MAX_CONCURRENCY', '8'))  # Upper bound a client may ask for
+DEFAULT_BATCH_SIZE = int(os.environ.get('LINGUALENS_BATCH_SIZE', '1'))  # Sentences per model call (1 disables batching)
+MAX_BATCH_SIZE = int(os.environ.get('LINGUALENS_MAX_BATCH_SIZE', '8'))
+
+# Finished sentence results, so repeated passages skip the API entirely
+sentence_cache = ResultCache(
+    os.environ.get('LINGUALENS_CACHE_DB', 'lingualens_cache.db'),
+    table='sentences',
+    max_entries=int(os.environ.get('LINGUALENS_CACHE_MAX_ENTRIES', '50000')),
+    max_age=float(os.environ.get('LINGUALENS_CACHE_MAX_AGE_DAYS', '30')) * 24 * 3600
+)
+
+# Finished grammar explanations, shared by every user
+grammar_cache = ResultCache(
+    os.environ.get('LINGUALENS_CACHE_DB', 'lingualens_cache.db'),
+    table='grammar',
+    max_entries=int(os.environ.get('LINGUALENS_GRAMMAR_CACHE_MAX_ENTRIES', '20000')),
+    max_age=float(os.environ.get('LINGUALENS_CACHE_MAX_AGE_DAYS', '30')) * 24 * 3600
+)
+
+# Per-word fallback: most words requested per sentence, and how often it was needed
+MAX_FALLBACK_WORDS = int(os.environ.get('LINGUALENS_MAX_FALLBACK_WORDS', '20'))
+fallback_stats = {'sentences': 0, 'words': 0, 'capped': 0, 'failed': 0}
+fallback_stats_lock = threading.Lock()
+
+# Word translations learned from earlier results, consulted before the fallback request
+lexicon = Lexicon(
+    os.environ.get('LINGUALENS_LEXICON_DB', 'lingualens_lexicon.db'),
+    min_count=int(os.environ.get('LINGUALENS_LEXICON_MIN_COUNT', '2')),
+    max_entries=int(os.environ.get('LINGUALENS_LEXICON_MAX_ENTRIES', '200000'))
+)
+
+# Romanize rule-based scripts (Cyrillic, Greek, Georgian, Armenian, kana) locally
+# instead of spending a serial model call per sentence
+LOCAL_ROMANIZATION = os.environ.get('LINGUALENS_LOCAL_ROMANIZATION', '1') != '0'
+
+# Extra attempts for a sentence whose response is not valid JSON for the schema
+JSON_RETRIES = int(os.environ.get('LINGUALENS_JSON_RETRIES', '2'))
+
+# Response schemas for structured JSON output. The API schema format has no
+# free-form maps, so word translations come back as a list of pairs.
+WORD_TRANSLATIONS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'word': {'type': 'string'},
+            'translation': {'type': 'string'},
+        },
+        'required': ['word', 'translation'],
+    },
+}
+SENTENCE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'original': {'type': 'string'},
+        'wordByWord': {'type': 'string'},
+        'fluentTranslation': {'type': 'string'},
+        'wordTranslations': WORD_TRANSLATIONS_SCHEMA,
+        'romanization': {'type': 'string'},
+    },
+    'required': ['original', 'wordByWord', 'fluentTranslation', 'wordTranslations'],
+}
+BATCH_SCHEMA = {'type': 'array', 'items': SENTENCE_SCHEMA}
+
+def json_config(schema):
+    return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+# Seconds between blank keep-alive lines while a /process stream waits for results
+HEARTBEAT_INTERVAL = float(os.environ.get('LINGUALENS_HEARTBEAT_INTERVAL', '5'))
+pipeline_stats = {'cancelled_sentences': 0, 'failed_streams': 0, 'dropped_sentences': 0, 'reused_sentences': 0}
+pipeline_stats_lock = threading.Lock()
+
+# Identical sentences requested by several streams at once share one set of model calls
+sentence_flights = SingleFlight()
+
+# Speculative grammar explanations for streamed sentences, made only while
+# model slots and rate-limit tokens are to spare, so a later click is a cache hit
+GRAMMAR_PREFETCH = os.environ.get('LINGUALENS_GRAMMAR_PREFETCH', '0') == '1'
+PREFETCH_MIN_TOKENS = float(os.environ.get('LINGUALENS_PREFETCH_MIN_TOKENS', '2'))  # Left for real requests
+grammar_prefetcher = Prefetcher(
+    budget=int(os.environ.get('LINGUALENS_PREFETCH_BUDGET', '60')),  # Prefetches per API key per hour
+    window=3600,
+    workers=int(os.environ.get('LINGUALENS_PREFETCH_WORKERS', '2'))
+)
+
+# Worker threads shared by all /process streams
+sentence_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('LINGUALENS_WORKERS', '32')),
+    thread_name_prefix='sentence'
+)
+
+# Background jobs for texts too long for a live /process stream
+job_store = JobStore(os.environ.get('LINGUALENS_JOBS_DB', 'lingualens_jobs.db'))
+JOB_MAX_CHARS = int(os.environ.get('LINGUALENS_JOB_MAX_CHARS', '5000000'))
+JOB_CONCURRENCY = int(os.environ.get('LINGUALENS_JOB_CONCURRENCY', '4'))  # Sentences in flight per job
+JOB_PAGE_SIZE = 64  # Sentences read from disk per step, and the default results page size
+job_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('LINGUALENS_JOB_WORKERS', '2')),  # Jobs processed at once
+    thread_name_prefix='job'
+)
+job_stops = {}  # job id -> threading.Event set to stop a queued or running job
+job_stops_lock = threading.Lock()
+interrupted_jobs = job_store.pause_unfinished()
+if interrupted_jobs:
+    print(f"Paused {interrupted_jobs} jobs interrupted by a restart")
+
+# Each user's processed texts, synced to the page in pages and deltas
+history_store = HistoryStore(
+    os.environ.get('LINGUALENS_HISTORY_DB', 'lingualens_history.db'),
+    max_entries=int(os.environ.get('LINGUALENS_HISTORY_MAX_ENTRIES', '1000'))  # Per user
+)
+HISTORY_MAX_CHARS = int(os.environ.get('LINGUALENS_HISTORY_MAX_CHARS', '30000'))
+HISTORY_PAGE_SIZE = 20
+
+# Pages kept in memory with gzip/brotli copies; edits to the files need a restart
+PAGES_DIR = os.path.dirname(os.path.abspath(__file__))
+page_assets = AssetStore({
+    'verify': (os.path.join(PAGES_DIR, 'verify.html'), 'text/html; charset=utf-8'),
+    'index': (os.path.join(PAGES_DIR, 'index.html'), 'text/html; charset=utf-8'),
+})
+# Set to 0 to send /process and job streams uncompressed
+COMPRESS_STREAMS = os.environ.get('LINGUALENS_COMPRESS_STREAMS', '1') != '0'
+
+# Punctuation split off the ends of a word before it is looked up
+WORD_PUNCTUATION = '.,!?;:"\'-«»“”„‘’()[]¿¡…'
+
+# Placeholder translation of a sentence whose processing failed
+TRANSLATION_ERROR = "Error processing translation"
+
 # Create the file if it doesn't exist
 if not os.path.exists(PAID_EMAILS_FILE):
     with open(PAID_EMAILS_FILE, 'w') as f:
         f.write('')  # Create empty file
 
+# Very large lists can live in SQLite instead (see the import-paid-emails command)
+PAID_EMAILS_DB = os.environ.get('LINGUALENS_PAID_EMAILS_DB')
+paid_emails = PaidEmailDatabase(PAID_EMAILS_DB) if PAID_EMAILS_DB else PaidEmailFile(PAID_EMAILS_FILE)
+
 def is_email_verified(email):
     """Check if the email is in the paid emails list"""
     if not email:
         return False
         
     try:
-        with open(PAID_EMAILS_FILE, 'r') as f:
-            paid_emails = [line.strip().lower() for line in f.readlines()]
-            return email.lower() in paid_emails
+        return paid_emails.contains(email)
     except Exception as e:
         print(f"Error checking email verification: {e}")
         return False
 
+@app.cli.command('import-paid-emails')
+@click.argument('path')
+def import_paid_emails(path):
+    """Bulk-import paid emails from a text file into LINGUALENS_PAID_EMAILS_DB"""
+    if not PAID_EMAILS_DB:
+        raise click.ClickException('Set LINGUALENS_PAID_EMAILS_DB to the SQLite file to import into')
+    added = paid_emails.import_file(path)
+    click.echo(f"Imported {added} new paid emails ({paid_emails.count()} total)")
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
@@ -39,99 +224,33 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def uses_non_latin_script(lang_code):
-    """
-    Determines if a language primarily uses a non-Latin writing system.
-    
-    Args:
-        lang_code: The ISO 639-1 or 639-2 language code
-        
-    Returns:
-        bool: True if the language uses a non-Latin script, False otherwise
-    """
-    # Languages that use non-Latin scripts
-    non_latin_scripts = {
-        # East Asian scripts
-        'zh': 'Chinese (Hanzi)',
-        'ja': 'Japanese (Kanji, Hiragana, Katakana)',
-        'ko': 'Korean (Hangul)',
-        
-        # Cyrillic script
-        'ru': 'Russian',
-        'uk': 'Ukrainian',
-        'be': 'Belarusian',
-        'bg': 'Bulgarian',
-        'sr': 'Serbian (Cyrillic)',
-        'mk': 'Macedonian',
-        'kk': 'Kazakh',
-        'ky': 'Kyrgyz',
-        'mn': 'Mongolian (Cyrillic)',
-        'tg': 'Tajik',
-        
-        # Arabic script
-        'ar': 'Arabic',
-        'fa': 'Persian (Farsi)',
-        'ur': 'Urdu',
-        'ps': 'Pashto',
-        'sd': 'Sindhi',
-        'ug': 'Uyghur',
-        'ckb': 'Kurdish (Sorani)',
-        'ms-Arab': 'Malay (Jawi)',
-        
-        # Indic scripts
-        'hi': 'Hindi (Devanagari)',
-        'bn': 'Bengali',
-        'ta': 'Tamil',
-        'te': 'Telugu',
-        'mr': 'Marathi',
-        'ne': 'Nepali',
-        'pa': 'Punjabi (Gurmukhi)',
-        'gu': 'Gujarati',
-        'or': 'Odia',
-        'kn': 'Kannada',
-        'ml': 'Malayalam',
-        'si': 'Sinhala',
-        'sa': 'Sanskrit',
-        
-        # Other scripts
-        'th': 'Thai',
-        'lo': 'Lao',
-        'km': 'Khmer',
-        'my': 'Burmese (Myanmar)',
-        'am': 'Amharic',
-        'ti': 'Tigrinya',
-        'he': 'Hebrew',
-        'yi': 'Yiddish',
-        'ka': 'Georgian',
-        'hy': 'Armenian',
-        'el': 'Greek',
-        'dv': 'Dhivehi (Thaana)',
-        
-        # Ethiopic script
-        'am': 'Amharic',
-        'ti': 'Tigrinya',
-        
-        # Other scripts
-        'bo': 'Tibetan',
-        'dz': 'Dzongkha',
-    }
-    
-    return lang_code in non_latin_scripts
-
 @app.route('/')
 def verification_page():
     """Show the verification page when accessing the root URL"""
     if 'verified_email' in session:
         return redirect(url_for('app_page'))
     
-    with open('verify.html', 'r') as f:
-        return f.read()
+    return serve_asset('verify')
 
 @app.route('/app')
 @login_required
 def app_page():
     """Main application page, requires login"""
-    return send_file('index.html')
+    return serve_asset('index')
+
+def serve_asset(name):
+    """Respond with a page from page_assets, or 304 if the client's copy is current"""
+    asset = page_assets.get(name)
+    status, body, headers = asset.respond(request.headers.get('Accept-Encoding'),
+                                          request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers, mimetype=asset.mimetype)
+
+def ndjson_response(chunks):
+    """Stream NDJSON lines, gzipped when the client accepts it"""
+    if COMPRESS_STREAMS and negotiate_encoding(request.headers.get('Accept-Encoding'), ('gzip',)) == 'gzip':
+        return Response(gzip_stream(chunks), mimetype='application/json',
+                        headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(chunks, mimetype='application/json')
 
 @app.route('/verify-email', methods=['POST'])
 def verify_email():
@@ -158,23 +277,74 @@ def process_text():
     if not api_key:
         return jsonify({'error': 'API key is required'}), 400
     
-    # Configure the Gemini API with the user's API key
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.5-pro-exp-03-25")
+    # Get the pooled, rate-limited Gemini client for the user's API key
+    model = gemini_clients.get(api_key, MODEL_NAME)
     
     text = data['text']
     source_lang = data.get('sourceLang', 'fr')
     target_lang = data.get('targetLang', 'en')
-    sentences = split_into_sentences(text, source_lang)
+    sentences = [s for s in split_into_sentences(text, source_lang) if s.strip()]
+    
+    # With knownHashes the client already holds some results (e.g. after a
+    # small edit): only new or changed sentences are processed and sent, after
+    # a first line listing every sentence's hash in order
+    incremental = isinstance(data.get('knownHashes'), list)
+    hashes, todo = plan_sentences(sentences, source_lang, target_lang, data.get('knownHashes'))
+    
+    # "ordered" streams results in sentence order; otherwise each line is
+    # tagged with its sentence index and sent as soon as it is ready
+    ordered = data.get('ordered', True)
+    concurrency = get_concurrency(data.get('concurrency'))
+    # With a batch size above 1, consecutive sentences share one model call
+    batch_size = get_batch_size(data.get('batchSize'))
+    batches = [[sentences[i] for i in todo[n:n + batch_size]] for n in range(0, len(todo), batch_size)]
+    
+    # Set once the client is gone, so workers that have not started yet skip their batch
+    cancelled = threading.Event()
+    # Model calls are queued fairly per user
+    tenant = session.get('verified_email')
+    # Clients may opt out of grammar prefetching, e.g. to save their quota
+    prefetch = GRAMMAR_PREFETCH and data.get('prefetchGrammar', True) is not False
     
     def generate():
-        for sentence in sentences:
-            if sentence.strip():
-                result = process_sentence(sentence, source_lang, target_lang, model)
-                yield json.dumps(result) + '\n'
-                time.sleep(4)  # Add a delay to avoid hitting API rate limits
+        def worker(batch):
+            if cancelled.is_set():
+                return []
+            return process_sentence_batch(batch, source_lang, target_lang, model, tenant)
+        
+        def on_cancel(skipped):
+            cancelled.set()
+            record_cancelled(sum(len(batch) for batch in skipped))
+        
+        def on_error(error, skipped):
+            cancelled.set()
+            record_pipeline_error(error, sum(len(batch) for batch in skipped))
+        
+        if incremental:
+            yield json.dumps({'hashes': hashes}) + '\n'
+        
+        pipeline = run_sentence_pipeline(batches, worker, concurrency, ordered, heartbeat=HEARTBEAT_INTERVAL,
+                                         on_cancel=on_cancel, on_error=on_error)
+        try:
+            for item in pipeline:
+                if item is None:
+                    # Blank heartbeat line; writing it is how a closed connection gets noticed
+                    yield '\n'
+                    continue
+                batch_index, results = item
+                for offset, result in enumerate(results):
+                    index = todo[batch_index * batch_size + offset]
+                    result = dict(result, hash=hashes[index])
+                    if not ordered or incremental:
+                        result['index'] = index
+                    yield json.dumps(result) + '\n'
+                    if prefetch:
+                        prefetch_grammar(result['original'], source_lang, target_lang, model, api_key, tenant)
+        finally:
+            # Runs when the client disconnects and the server closes this generator
+            pipeline.close()
     
-    return Response(generate(), mimetype='application/json')
+    return ndjson_response(generate())
 
 @app.route('/grammar-explanation', methods=['POST'])
 @login_required
@@ -189,16 +359,208 @@ def get_grammar_explanation():
     if not api_key:
         return jsonify({'error': 'API key is required'}), 400
     
-    # Configure the Gemini API with the user's API key
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-2.5-pro-exp-03-25")
+    # Get the pooled, rate-limited Gemini client for the user's API key
+    model = gemini_clients.get(api_key, MODEL_NAME)
     
     sentence = data['sentence']
     source_lang = data.get('sourceLang', 'fr')
     target_lang = data.get('targetLang', 'en')
+    if GRAMMAR_PREFETCH:
+        grammar_prefetcher.record_request(grammar_cache_key(sentence, source_lang, target_lang, model.model_name))
+    
+    # Stream the Markdown as the model produces it
+    return Response(
+        stream_grammar_explanation(sentence, source_lang, target_lang, model, session.get('verified_email')),
+        mimetype='text/plain; charset=utf-8'
+    )
+
+@app.route('/jobs', methods=['POST'])
+@login_required
+def create_job():
+    """
+    Start a background translation job for a long text.
+    
+    Accepts JSON like /process, or a multipart form with a text file in
+    `file` and the other fields as form values. The text is segmented into
+    sentences as it is read and stored on disk before processing starts.
+    """
+    if request.files.get('file'):
+        data = request.form
+        chunks = decode_upload(request.files['file'].stream)
+    else:
+        data = request.get_json(silent=True) or {}
+        if 'text' not in data:
+            return jsonify({'error': 'No text provided'}), 400
+        chunks = [data['text']]
+    
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+    
+    model = gemini_clients.get(api_key, MODEL_NAME)
+    source_lang = data.get('sourceLang', 'fr')
+    target_lang = data.get('targetLang', 'en')
+    tenant = session.get('verified_email')
     
-    explanation = generate_grammar_explanation(sentence, source_lang, target_lang, model)
-    return explanation
+    job_id = job_store.create(tenant, source_lang, target_lang, get_batch_size(data.get('batchSize')))
+    try:
+        segment_job(job_id, chunks, source_lang)
+    except ValueError as e:
+        job_store.delete(job_id)
+        return jsonify({'error': str(e)}), 413
+    except Exception:
+        # E.g. the client went away mid-upload; a partly read job must not be run
+        job_store.delete(job_id)
+        raise
+    
+    start_job(job_id, model, tenant)
+    return jsonify(job_status(job_store.get(job_id))), 202
+
+@app.route('/jobs/<job_id>')
+@login_required
+def get_job(job_id):
+    """Progress of a job"""
+    job = find_job(job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/jobs/<job_id>/results')
+@login_required
+def get_job_results(job_id):
+    """One page of results; sentences not processed yet are null"""
+    job = find_job(job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    offset, limit = get_page(request.args)
+    return jsonify(job_results_page(job, offset, limit))
+
+@app.route('/jobs/<job_id>/stream')
+@login_required
+def stream_job(job_id):
+    """
+    Stream a job's results as NDJSON in sentence order, starting at `offset`
+    and following the job until it stops. Blank lines are keep-alives.
+    """
+    job = find_job(job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    offset, _ = get_page(request.args)
+    
+    def generate():
+        for item in follow_job(job_id, offset):
+            yield '\n' if item is None else json.dumps(item) + '\n'
+    
+    return ndjson_response(generate())
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+@login_required
+def resume_job(job_id):
+    """Restart a paused, failed or cancelled job from its last checkpoint"""
+    job = find_job(job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    data = request.get_json(silent=True) or {}
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+    if job['status'] in UNFINISHED_JOB_STATES:
+        return jsonify({'error': f"Job is {job['status']}"}), 409
+    if not job['segmented']:
+        return jsonify({'error': 'The text of this job was not read completely; create a new job'}), 409
+    start_job(job_id, gemini_clients.get(api_key, MODEL_NAME), session.get('verified_email'))
+    return jsonify(job_status(job_store.get(job_id))), 202
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@login_required
+def delete_job(job_id):
+    """Stop a job and delete it with its results"""
+    if find_job(job_id, session.get('verified_email')) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    stop_job(job_id)
+    job_store.delete(job_id)
+    return jsonify({'deleted': True})
+
+@app.route('/history', methods=['GET'])
+@login_required
+def get_history():
+    """One page of history, newest first; pass the returned `next` as `before` for older entries"""
+    before, limit = get_history_cursor(request.args, 'before')
+    entries, cursor = history_store.page(session.get('verified_email'), before, limit)
+    return jsonify({'entries': entries, 'next': cursor})
+
+@app.route('/history', methods=['POST'])
+@login_required
+def add_history():
+    """Append a processed text to the user's history"""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'No text provided'}), 400
+    if len(text) > HISTORY_MAX_CHARS:
+        return jsonify({'error': f'Text is longer than {HISTORY_MAX_CHARS} characters'}), 413
+    entry = history_store.append(session.get('verified_email'), text,
+                                 str(data.get('sourceLang', 'fr')), str(data.get('targetLang', 'en')))
+    return jsonify(entry), 201
+
+@app.route('/history/sync')
+@login_required
+def sync_history():
+    """
+    Entries newer than `after` (the newest id the client holds), oldest
+    first. While `more` is true, call again with the last id returned.
+    """
+    after, limit = get_history_cursor(request.args, 'after')
+    entries, more = history_store.since(session.get('verified_email'), after or 0, limit)
+    return jsonify({'entries': entries, 'more': more})
+
+@app.route('/stats')
+def stats():
+    """Operational counters for the translation pipeline"""
+    return jsonify(collect_stats())
+
+def collect_stats():
+    return {
+        'sentence_cache': sentence_cache.stats(),
+        'grammar_cache': grammar_cache.stats(),
+        'word_fallback': dict(fallback_stats),
+        'lexicon': lexicon.stats(),
+        'gemini_clients': gemini_clients.stats(),
+        'rate_limiter': rate_limiter.stats(),
+        'pipeline': dict(pipeline_stats),
+        'singleflight': sentence_flights.stats(),
+        'scheduler': model_scheduler.stats(),
+        'jobs': job_store.stats(),
+        'grammar_prefetch': grammar_prefetcher.stats(),
+        'routing': collect_routing_stats(),
+        'history': history_store.stats(),
+        'hedging': hedger.stats(),
+        'sdk': sdk.stats()
+    }
+
+def collect_routing_stats():
+    with routing_stats_lock:
+        stats = dict(routing_stats)
+    # Fast-model answers (whole sentences, batched or not) that had to be escalated
+    answered = stats['fast_accepted'] + stats['escalations']
+    stats['escalation_rate'] = round(stats['escalations'] / answered, 4) if answered else 0.0
+    return stats
+
+@app.route('/ready')
+def readiness():
+    """Readiness probe: 503 until the server can answer translation requests without a cold start"""
+    checks = readiness_checks()
+    return jsonify({'ready': all(checks.values()), 'checks': checks}), 200 if all(checks.values()) else 503
+
+def readiness_checks():
+    # Without preloading the first request imports the SDK itself, and a
+    # model factory (the benchmarks' fake backend) does without it
+    return {'gemini_sdk': sdk.ready() or not PRELOAD_SDK or gemini_clients.model_factory is not None}
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics: per-stage latency, tokens, parse failures and pipeline counters"""
+    return Response(metrics.registry.render(collect_stats()), mimetype='text/plain; version=0.0.4')
 
 @app.route('/logout')
 def logout():
@@ -206,8 +568,8 @@ def logout():
     session.pop('verified_email', None)
     return redirect(url_for('verification_page'))
 
-def generate_grammar_explanation(sentence, source_lang, target_lang, model):
-    prompt = f"""
+def build_grammar_prompt(sentence, source_lang, target_lang):
+    return f"""
     Analyze this {get_language_name(source_lang)} sentence in detail for a {get_language_name(target_lang)} speaker:
     
     "{sentence}"
@@ -219,10 +581,25 @@ def generate_grammar_explanation(sentence, source_lang, target_lang, model):
     
     Use ** around key terms or phrases that should be highlighted.
     """
+
+def grammar_cache_key(sentence, source_lang, target_lang, model_name):
+    return make_key(normalize_sentence(sentence), source_lang, target_lang, model_name)
+
+def generate_grammar_explanation(sentence, source_lang, target_lang, model, tenant=None):
+    return run_model_steps(grammar_explanation_steps(sentence, source_lang, target_lang, model.model_name), model, tenant)
+
+def grammar_explanation_steps(sentence, source_lang, target_lang, model_name, stage='grammar'):
+    cache_key = grammar_cache_key(sentence, source_lang, target_lang, model_name)
+    cached = grammar_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    prompt = build_grammar_prompt(sentence, source_lang, target_lang)
     
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        text = yield ModelRequest(stage, prompt, source_lang, target_lang, model=STAGE_MODELS['grammar'])
+        grammar_cache.set(cache_key, text)
+        return text
      
     except Exception as e:
         print(f"Error generating grammar explanation: {e}")
@@ -231,20 +608,293 @@ def generate_grammar_explanation(sentence, source_lang, target_lang, model):
             "error": f"Error: {e}"
         }
 
-def process_sentence(sentence, source_lang, target_lang, model):
-    # Check if romanization is needed for non-Latin script languages
-    needs_romanization = uses_non_latin_script(source_lang)
+def prefetch_grammar(sentence, source_lang, target_lang, model, api_key, tenant=None):
+    """
+    Queue a background grammar explanation for a sentence the client just
+    received, if it is not cached yet and the model has capacity to spare.
+    
+    Returns:
+        bool: True if a prefetch was started
+    """
+    cache_key = grammar_cache_key(sentence, source_lang, target_lang, model.model_name)
+    if grammar_cache.contains(cache_key):
+        return False
+    
+    def run():
+        steps = grammar_explanation_steps(sentence, source_lang, target_lang, model.model_name, stage='grammar_prefetch')
+        text = run_model_steps(steps, model, tenant)
+        if not isinstance(text, str):
+            raise RuntimeError(text['error'])
+    
+    headroom = model_scheduler.headroom() > 0 and model.bucket.available() >= PREFETCH_MIN_TOKENS
+    return grammar_prefetcher.offer(api_key, cache_key, run, headroom)
+
+def stream_grammar_explanation(sentence, source_lang, target_lang, model, tenant=None):
+    """
+    Yield the grammar explanation in text chunks as the model generates them.
+    
+    Cached explanations are returned as a single chunk; a fully streamed
+    explanation is cached once it is complete. The model slot is held
+    until the stream ends.
+    """
+    cache_key = grammar_cache_key(sentence, source_lang, target_lang, model.model_name)
+    cached = grammar_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    
+    prompt = build_grammar_prompt(sentence, source_lang, target_lang)
+    request = ModelRequest('grammar', prompt, source_lang, target_lang, model=STAGE_MODELS['grammar'])
+    chunks = []
+    started = time.monotonic()
+    
+    try:
+        client = client_for(model, request)
+        slot = lambda timeout: model_scheduler.slot(tenant, request.stage, timeout)
+        with client.stream_content(prompt, deadline=deadline_for(request.stage), slot=slot) as response:
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield text
+    except Exception as e:
+        metrics.record_model_call(request, time.monotonic() - started, error=e)
+        print(f"Error generating grammar explanation: {e}")
+        yield "\n\nUnable to generate grammar explanation. Please try again."
+        return
+    
+    metrics.record_model_call(request, time.monotonic() - started, response)
+    
+    if chunks:
+        grammar_cache.set(cache_key, ''.join(chunks))
+
+def sentence_cache_key(sentence, source_lang, target_lang, model_name):
+    return make_key(normalize_sentence(sentence), source_lang, target_lang, model_name)
+
+def parse_model_json(response_text, request=None):
+    """
+    Extract the JSON payload from a model response, fenced or bare.
+    
+    If the ModelRequest the response answers is given, the outcome is
+    counted in the JSON parse metrics for its stage and language pair.
+    """
+    try:
+        json_match = re.search(r'```(?:json)?\n(.*?)\n```', response_text, re.DOTALL)
+        if json_match:
+            result = json.loads(json_match.group(1))
+        else:
+            result = json.loads(response_text)
+    except ValueError:
+        if request is not None:
+            metrics.json_parses.inc(stage=request.stage, source_lang=request.source_lang,
+                                    target_lang=request.target_lang, outcome='failed')
+        raise
+    if request is not None:
+        metrics.json_parses.inc(stage=request.stage, source_lang=request.source_lang,
+                                target_lang=request.target_lang, outcome='ok')
+    return result
+
+def word_map_from_json(value):
+    """Turn wordTranslations from the response (list of pairs or a dict) into a dict"""
+    if isinstance(value, dict):
+        return {str(word): str(translation) for word, translation in value.items()}
+    if isinstance(value, list):
+        return {str(item['word']): str(item['translation']) for item in value
+                if isinstance(item, dict) and 'word' in item and 'translation' in item}
+    raise ValueError(f"wordTranslations must be a list or object, got {type(value).__name__}")
+
+def validate_sentence_result(data, needs_romanization, sentence=None):
+    """
+    Check a parsed Birkenbihl object against SENTENCE_SCHEMA.
+    
+    Args:
+        data: Parsed JSON from the model
+        needs_romanization: Whether a romanization field is required
+        sentence: If given, the original field must match this sentence
+        
+    Returns:
+        dict: The result with wordTranslations as a word -> translation dict
+        
+    Raises:
+        ValueError: If the object is incomplete or malformed
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    for field in ('original', 'wordByWord', 'fluentTranslation'):
+        if not isinstance(data.get(field), str):
+            raise ValueError(f"missing or non-string field '{field}'")
+    if not data['fluentTranslation'].strip():
+        raise ValueError("empty fluentTranslation")
+    if sentence is not None and normalize_sentence(data['original']) != normalize_sentence(sentence):
+        raise ValueError("original does not match the sentence")
+    if needs_romanization and not (isinstance(data.get('romanization'), str) and data['romanization'].strip()):
+        raise ValueError("missing romanization")
+    return dict(data, wordTranslations=word_map_from_json(data.get('wordTranslations')))
+
+def complete_sentence_steps(result, sentence, romanization, source_lang, target_lang):
+    """
+    Rebuild wordByWord from wordTranslations so it lines up word for word
+    with the (romanized) sentence, translating any missing words in one request.
+    
+    Returns:
+        tuple: (result, whether every word got a translation). Results with
+        words left in source form, because the fallback failed or was
+        capped, are not worth caching.
+    """
+    # Split the text to process into words (use romanized text if available)
+    text_to_split = romanization or sentence
+    original_words = text_to_split.split()
+    print(f"Words to process: {len(original_words)} - {original_words}")
+
+    # Clean punctuation from around words for lookup in wordTranslations;
+    # apostrophes and hyphens inside a word are part of it
+    cleaned_original_words = [word.strip(WORD_PUNCTUATION) for word in original_words]
+
+    # Resolve every word missing from wordTranslations with one request
+    word_translations = result.setdefault('wordTranslations', {})
+    known = {}
+    missing_words = []
+    for cleaned_word in cleaned_original_words:
+        if cleaned_word and cleaned_word not in word_translations and cleaned_word not in missing_words:
+            missing_words.append(cleaned_word)
+    if missing_words:
+        # Words seen in earlier results come from the lexicon, the rest from the model
+        known = lexicon.lookup(source_lang, target_lang, missing_words)
+        word_translations.update(known)
+        missing_words = [word for word in missing_words if word not in known]
+    metrics.fallback_words.observe(len(missing_words), source_lang=source_lang, target_lang=target_lang)
+    if missing_words:
+        print(f"Words not found in wordTranslations, requesting translations: {missing_words}")
+        word_translations.update((yield from translate_missing_words_steps(missing_words, sentence, source_lang, target_lang)))
+
+    # Initialize the word-by-word translation list
+    word_by_word_words = []
+
+    # For each word, find its translation
+    complete = all(not word or word in word_translations for word in cleaned_original_words)
+    for orig_word, cleaned_word in zip(original_words, cleaned_original_words):
+        if not cleaned_word:
+            # Pure punctuation stays as it is
+            word_by_word_words.append(orig_word)
+            continue
+        # Words the fallback could not resolve keep their source form so the alignment holds
+        translation = str(word_translations.get(cleaned_word, cleaned_word))
+        # Put the original word's punctuation back around the translation
+        leading = orig_word[:orig_word.index(cleaned_word)]
+        trailing = orig_word[len(leading) + len(cleaned_word):]
+        word_by_word_words.append(leading + translation + trailing)
+
+    # Update the wordByWord field with the correct number of words
+    result['wordByWord'] = ' '.join(word_by_word_words)
+    print(f"Updated wordByWord words: {len(word_by_word_words)} - {word_by_word_words}")
+    print(f"Updated wordByWord: {result['wordByWord']}")
+
+    # Verify the word count matches
+    if len(original_words) != len(word_by_word_words):
+        print(f"Warning: Word count mismatch after processing! Original: {len(original_words)}, WordByWord: {len(word_by_word_words)}")
+
+    # Ensure romanization is included in the result
+    if romanization:
+        result['romanization'] = romanization
+
+    # Only what the model produced is learned; translations read from the
+    # lexicon would otherwise raise their own counts every time they are reused
+    lexicon.add(source_lang, target_lang, {word: translation for word, translation in word_translations.items()
+                                           if word not in known})
+    return result, complete
+
+def translate_missing_words_steps(words, sentence, source_lang, target_lang):
+    """
+    Translate words the main response left out of wordTranslations.
+    
+    All words are resolved with a single request returning a JSON
+    word -> translation map. At most MAX_FALLBACK_WORDS words are requested,
+    so a bad main response cannot turn into dozens of extra calls.
+    
+    Returns:
+        dict: Translations for the words the model resolved
+    """
+    capped = words[MAX_FALLBACK_WORDS:]
+    words = words[:MAX_FALLBACK_WORDS]
+    record_fallback(sentences=1, words=len(words), capped=len(capped))
+    if capped:
+        print(f"Fallback cap reached, leaving {len(capped)} words untranslated: {capped}")
+    if not words:
+        return {}
+    
+    word_list = '\n'.join(f'- "{word}"' for word in words)
+    prompt = f"""
+    Translate each of these {get_language_name(source_lang)} words to {get_language_name(target_lang)} in the context of the sentence: "{sentence}"
+    {word_list}
+    
+    Return a JSON list with one {{"word", "translation"}} object per word, with each word exactly as given.
+    Provide each translation as a single word or a hyphenated phrase if necessary.
+    """
+    
+    try:
+        request = ModelRequest('word_fallback', prompt, source_lang, target_lang, json_config(WORD_TRANSLATIONS_SCHEMA),
+                               STAGE_MODELS['word_fallback'])
+        translations = word_map_from_json(parse_model_json((yield request), request))
+    except Exception as e:
+        print(f"Error translating missing words: {e}")
+        record_fallback(failed=1)
+        return {}
+    
+    resolved = {word: str(translations[word]).strip() for word in words
+                if word in translations and str(translations[word]).strip()}
+    print(f"Translated missing words: {resolved}")
+    return resolved
+
+def record_fallback(**counts):
+    with fallback_stats_lock:
+        for name, value in counts.items():
+            fallback_stats[name] += value
+
+def process_sentence(sentence, source_lang, target_lang, model, tenant=None):
+    key = flight_key([sentence], source_lang, target_lang, model.model_name)
+    return sentence_flights.do(key, lambda: run_model_steps(
+        process_sentence_steps(sentence, source_lang, target_lang, model.model_name), model, tenant),
+        shareable=translated)
+
+def process_sentence_steps(sentence, source_lang, target_lang, model_name, allow_fast=True):
+    """
+    Birkenbihl processing of one sentence, written as a step generator:
+    it yields a ModelRequest for each model call and receives the response
+    text, so the same logic runs under the sync and async drivers.
+    
+    Short, simple sentences are first sent to FAST_MODEL (unless allow_fast
+    is False) and escalated to the sentence model if the answer is unusable.
+    """
+    # Serve repeated sentences straight from the cache
+    cache_key = sentence_cache_key(sentence, source_lang, target_lang, model_name)
+    cached = sentence_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Romanize only sentences that actually contain non-Latin letters
+    needs_romanization = has_non_latin_letters(sentence)
     
     romanization = ""
     if needs_romanization:
-        # First, get the romanization
+        romanization = local_romanization(sentence, source_lang)
+        if romanization is not None:
+            metrics.romanizations.inc(source='local', source_lang=source_lang)
+    if needs_romanization and romanization is None:
+        # The script needs the model, so get the romanization first
         romanization_prompt = f"""
         Provide the romanized pronunciation guide for the following {get_language_name(source_lang)} sentence using the most widely accepted romanization standard for this language:
         "{sentence}"
         Return only the romanized text.
         """
-        romanization_response = model.generate_content(romanization_prompt)
-        romanization = romanization_response.text.strip()
+        request = ModelRequest('romanization', romanization_prompt, source_lang, target_lang,
+                               model=STAGE_MODELS['romanization'])
+        try:
+            romanization = (yield request).strip()
+        except Exception as e:
+            # A failed or timed-out romanization costs this sentence only, not the stream
+            print(f"Error romanizing sentence: {e}")
+            return sentence_error_result(sentence, needs_romanization)
+        metrics.romanizations.inc(source='model', source_lang=source_lang)
     
     # Use the romanized text for word-by-word translation if available
     text_to_process = romanization if needs_romanization else sentence
@@ -261,7 +911,7 @@ def process_sentence(sentence, source_lang, target_lang, model):
     1. original: The original sentence
     2. wordByWord: A word-by-word literal translation preserving original word order
     3. fluentTranslation: A natural, fluent translation of the sentence
-    4. wordTranslations: A dictionary mapping each word in the original to its translation
+    4. wordTranslations: A list of {{"word", "translation"}} objects, one for each word in the text to process
     {'5. romanization: The romanized pronunciation guide for the original text' if needs_romanization else ''}
     
     IMPORTANT: 
@@ -272,83 +922,564 @@ def process_sentence(sentence, source_lang, target_lang, model):
     """
     
     try:
-        # Send request to Gemini model
-        response = model.generate_content(prompt)
-        response_text = response.text
+        # One attempt on the fast model if the sentence qualifies, then the
+        # sentence model with its retries; only this sentence is repeated
+        fast = allow_fast and use_fast_model([sentence], source_lang)
+        attempts = ([FAST_MODEL] if fast else []) + [STAGE_MODELS['sentence']] * (JSON_RETRIES + 1)
+        for attempt, attempt_model in enumerate(attempts):
+            # Ask for JSON that follows SENTENCE_SCHEMA
+            request = ModelRequest('sentence', prompt, source_lang, target_lang, json_config(SENTENCE_SCHEMA), attempt_model)
+            try:
+                response_text = yield request
+                # The romanization is already known, so the model need not echo it back
+                result = validate_sentence_result(parse_model_json(response_text, request), False)
+                if fast and attempt == 0:
+                    check_word_count(result, text_to_process)
+                    record_routing(fast_accepted=1)
+                break
+            except Exception as e:
+                if attempt == len(attempts) - 1:
+                    raise
+                if fast and attempt == 0:
+                    record_escalation(request, e)
+                else:
+                    metrics.json_retries.inc(stage=request.stage, source_lang=source_lang, target_lang=target_lang)
+                    print(f"Invalid response for sentence (attempt {attempt + 1}), retrying: {e}")
         
-        # Extract JSON from response
-        json_match = re.search(r'```(?:json)?\n(.*?)\n```', response_text, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group(1))
-        else:
-            result = json.loads(response_text)
-
-        # Split the text to process into words (use romanized text if available)
-        text_to_split = romanization if needs_romanization else sentence
-        original_words = text_to_split.split()
-        print(f"Words to process: {len(original_words)} - {original_words}")
-
-        # Clean punctuation from words for lookup in wordTranslations
-        cleaned_original_words = [re.sub(r'[.,!?;:"\'-]', '', word) for word in original_words]
-
-        # Initialize the word-by-word translation list
-        word_by_word_words = []
-
-        # For each word, find its translation
-        for idx, (orig_word, cleaned_word) in enumerate(zip(original_words, cleaned_original_words)):
-            # Check if the cleaned word exists in wordTranslations
-            if cleaned_word in result.get('wordTranslations', {}):
-                translation = result['wordTranslations'][cleaned_word]
-                # If the original word had punctuation, append it to the translation
-                if orig_word != cleaned_word:
-                    punctuation = orig_word[len(cleaned_word):]
-                    translation += punctuation
-                word_by_word_words.append(translation)
-            else:
-                # If the word is not in wordTranslations, translate it individually
-                print(f"Word '{cleaned_word}' not found in wordTranslations, requesting translation...")
-                word_prompt = f"""
-                Translate the word "{cleaned_word}" from {get_language_name(source_lang)} to {get_language_name(target_lang)} in the context of the sentence: "{sentence}"
-                Provide the translation as a single word or a hyphenated phrase if necessary. Return only the translation.
-                """
-                word_response = model.generate_content(word_prompt)
-                word_translation = word_response.text.strip()
-                print(f"Translated '{cleaned_word}' to '{word_translation}'")
-
-                # If the original word had punctuation, append it to the translation
-                if orig_word != cleaned_word:
-                    punctuation = orig_word[len(cleaned_word):]
-                    word_translation += punctuation
-                word_by_word_words.append(word_translation)
-                # Update wordTranslations for future reference
-                result.setdefault('wordTranslations', {})[cleaned_word] = word_translation
-
-        # Update the wordByWord field with the correct number of words
-        result['wordByWord'] = ' '.join(word_by_word_words)
-        print(f"Updated wordByWord words: {len(word_by_word_words)} - {word_by_word_words}")
-        print(f"Updated wordByWord: {result['wordByWord']}")
-
-        # Verify the word count matches
-        if len(original_words) != len(word_by_word_words):
-            print(f"Warning: Word count mismatch after processing! Original: {len(original_words)}, WordByWord: {len(word_by_word_words)}")
-
-        # Ensure romanization is included in the result
-        if needs_romanization:
-            result['romanization'] = romanization
+        result, complete = yield from complete_sentence_steps(result, sentence, romanization, source_lang, target_lang)
 
+        if complete:
+            sentence_cache.set(cache_key, result)
         return result
 
     except Exception as e:
         print(f"Error processing sentence: {e}")
-        result = {
-            "original": sentence,
-            "wordByWord": "Error processing translation",
-            "fluentTranslation": "Error processing translation",
-            "wordTranslations": {}
-        }
+        return sentence_error_result(sentence, needs_romanization)
+
+def sentence_error_result(sentence, needs_romanization):
+    """The result row streamed for a sentence whose processing failed"""
+    result = {
+        "original": sentence,
+        "wordByWord": TRANSLATION_ERROR,
+        "fluentTranslation": TRANSLATION_ERROR,
+        "wordTranslations": {}
+    }
+    if needs_romanization:
+        result["romanization"] = "Romanization unavailable"
+    return result
+
+def process_sentence_batch(sentences, source_lang, target_lang, model, tenant=None):
+    key = flight_key(sentences, source_lang, target_lang, model.model_name)
+    return sentence_flights.do(key, lambda: run_model_steps(
+        process_sentence_batch_steps(sentences, source_lang, target_lang, model.model_name), model, tenant),
+        shareable=translated)
+
+def flight_key(sentences, source_lang, target_lang, model_name):
+    """Key under which concurrent requests for the same sentences are coalesced"""
+    return make_key(*(sentence_cache_key(sentence, source_lang, target_lang, model_name) for sentence in sentences))
+
+def translated(results):
+    """
+    Whether a result (or list of results) may be handed to coalesced callers.
+
+    The key leaves out the API key, so an error row, maybe caused by the
+    leader's invalid or rate-limited key, is never shared.
+    """
+    results = results if isinstance(results, list) else [results]
+    return all(result.get('wordByWord') != TRANSLATION_ERROR for result in results)
+
+def process_sentence_batch_steps(sentences, source_lang, target_lang, model_name):
+    """
+    Process several consecutive sentences with a single model call.
+    
+    The model is asked for a JSON array with one Birkenbihl object per
+    sentence. Items that fail validation, or a response that cannot be
+    parsed at all, fall back to process_sentence for the affected sentences.
+    
+    Returns:
+        list: One result dict per sentence, in input order
+    """
+    started = time.monotonic()
+    if len(sentences) == 1:
+        result = yield from process_sentence_steps(sentences[0], source_lang, target_lang, model_name)
+        observe_sentence_time(started, 1, source_lang, target_lang)
+        return [result]
+    
+    results = [None] * len(sentences)
+    fast = False
+    todo = []
+    for i, sentence in enumerate(sentences):
+        cached = sentence_cache.get(sentence_cache_key(sentence, source_lang, target_lang, model_name))
+        if cached is not None:
+            results[i] = cached
+        else:
+            todo.append(i)
+    
+    if len(todo) > 1:
+        romanized = {i for i in todo if has_non_latin_letters(sentences[i])}
+        needs_romanization = bool(romanized)
+        local = {}
         if needs_romanization:
-            result["romanization"] = "Romanization unavailable"
-        return result
+            # Sentences without non-Latin letters are processed as they are
+            local = {i: local_romanization(sentences[i], source_lang) if i in romanized else sentences[i]
+                     for i in todo}
+            if any(romanization is None for romanization in local.values()):
+                local = {}
+        # With every romanization known locally, the model only has to translate
+        model_romanizes = needs_romanization and not local
+        numbered = '\n'.join(
+            f'{n + 1}. "{sentences[i]}"' + (f'\n       Romanized: "{local[i]}"' if local and i in romanized else '')
+            for n, i in enumerate(todo)
+        )
+        prompt = f"""
+    Process each of these {get_language_name(source_lang)} sentences using the Birkenbihl method for a {get_language_name(target_lang)} speaker.
+    
+    Sentences:
+    {numbered}
+    
+    Return a JSON array with exactly {len(todo)} objects, one per sentence and in the same order. Each object has the following fields:
+    1. original: The original sentence, copied exactly
+    2. wordByWord: A word-by-word literal translation preserving original word order
+    3. fluentTranslation: A natural, fluent translation of the sentence
+    4. wordTranslations: A list of {{"word", "translation"}} objects, one for each word in the {'romanized sentence' if needs_romanization else 'original sentence'}
+    {'5. romanization: The romanized pronunciation guide for the sentence, using the most widely accepted romanization standard for this language' if model_romanizes else ''}
+    
+    IMPORTANT: 
+    - Provide all translations (wordByWord and fluentTranslation) in {get_language_name(target_lang)}
+    - Make sure each wordByWord translation has EXACTLY the same number of words as the {'romanized sentence' if needs_romanization else 'original sentence'}
+    - If a single source word translates to multiple target words, hyphenate them (e.g., "bonjour" -> "good-morning")
+    - If multiple source words translate to one target word, repeat the target word for each source word
+    """
+        
+        # A batch of only short, simple sentences goes to the fast model; what it
+        # gets wrong is escalated sentence by sentence below
+        fast = use_fast_model([sentences[i] for i in todo], source_lang)
+        request = ModelRequest('batch', prompt, source_lang, target_lang, json_config(BATCH_SCHEMA),
+                               FAST_MODEL if fast else STAGE_MODELS['sentence'])
+        try:
+            items = parse_model_json((yield request), request)
+            if not isinstance(items, list):
+                raise ValueError(f"expected a JSON array, got {type(items).__name__}")
+        except Exception as e:
+            print(f"Error processing sentence batch: {e}")
+            items = []
+        
+        for n, i in enumerate(todo):
+            item = items[n] if n < len(items) else None
+            try:
+                item = validate_sentence_result(item, model_romanizes, sentences[i])
+                if fast:
+                    check_word_count(item, local.get(i, sentences[i]))
+                    record_routing(fast_accepted=1)
+            except ValueError as e:
+                if fast:
+                    record_escalation(request, e)
+                else:
+                    print(f"Invalid batch item for sentence {sentences[i]!r}: {e}")
+                continue
+            if i not in romanized:
+                romanization = ''
+            elif local:
+                romanization = local[i]
+                metrics.romanizations.inc(source='local', source_lang=source_lang)
+            else:
+                romanization = item.get('romanization', '').strip()
+                if romanization:
+                    metrics.romanizations.inc(source='model', source_lang=source_lang)
+            try:
+                result, complete = yield from complete_sentence_steps(item, sentences[i], romanization, source_lang, target_lang)
+            except Exception as e:
+                print(f"Error completing batched sentence: {e}")
+                continue
+            if complete:
+                sentence_cache.set(sentence_cache_key(sentences[i], source_lang, target_lang, model_name), result)
+            results[i] = result
+    
+    # Anything the batch did not cover is processed on its own
+    for i, sentence in enumerate(sentences):
+        if results[i] is None:
+            print(f"Falling back to single-sentence processing for: {sentence}")
+            # Sentences the fast model got wrong go straight to the sentence model
+            results[i] = yield from process_sentence_steps(sentence, source_lang, target_lang, model_name,
+                                                           allow_fast=not fast)
+    
+    observe_sentence_time(started, len(sentences), source_lang, target_lang)
+    return results
+
+def use_fast_model(sentences, source_lang):
+    """
+    Whether sentences are short and simple enough to try FAST_MODEL first.
+    
+    Scripts whose romanization needs the model are left to the sentence
+    model, as are long sentences by word count or length.
+    """
+    if not FAST_MODEL:
+        return False
+    if any(has_non_latin_letters(s) and local_romanization(s, source_lang) is None for s in sentences):
+        return False
+    return all(len(s.split()) <= FAST_MAX_WORDS and len(s) <= FAST_MAX_CHARS for s in sentences)
+
+def check_word_count(result, text_to_process):
+    """
+    Extra validation for fast-model answers: wordByWord must have one word
+    per word of the text to process.
+    
+    Raises:
+        ValueError: On a word count mismatch
+    """
+    expected = len(text_to_process.split())
+    got = len(result['wordByWord'].split())
+    if got != expected:
+        raise ValueError(f"wordByWord has {got} words, expected {expected}")
+
+def record_escalation(request, error):
+    print(f"Escalating {request.stage} answer from {request.model} to the sentence model: {error}")
+    metrics.escalations.inc(stage=request.stage, source_lang=request.source_lang, target_lang=request.target_lang)
+    record_routing(escalations=1)
+
+def record_routing(**counts):
+    with routing_stats_lock:
+        for name, value in counts.items():
+            routing_stats[name] += value
+
+def local_romanization(sentence, source_lang):
+    """
+    Romanize a sentence with the local transliteration tables.
+    
+    Returns:
+        str: The romanized sentence, or None if the script needs the model
+    """
+    if not LOCAL_ROMANIZATION:
+        return None
+    return transliteration.romanize(sentence, source_lang)
+
+def observe_sentence_time(started, count, source_lang, target_lang):
+    """Every sentence of a batch waited for the whole batch"""
+    elapsed = time.monotonic() - started
+    for _ in range(count):
+        metrics.sentence_seconds.observe(elapsed, source_lang=source_lang, target_lang=target_lang)
+
+def get_concurrency(requested):
+    """Clamp the client's requested concurrency to the configured limits"""
+    try:
+        concurrency = int(requested) if requested is not None else DEFAULT_CONCURRENCY
+    except (TypeError, ValueError):
+        concurrency = DEFAULT_CONCURRENCY
+    return max(1, min(concurrency, MAX_CONCURRENCY))
+
+def get_batch_size(requested):
+    """Clamp the client's requested batch size to the configured limits"""
+    try:
+        batch_size = int(requested) if requested is not None else DEFAULT_BATCH_SIZE
+    except (TypeError, ValueError):
+        batch_size = DEFAULT_BATCH_SIZE
+    return max(1, min(batch_size, MAX_BATCH_SIZE))
+
+def run_sentence_pipeline(sentences, worker, concurrency, ordered=True, heartbeat=None, on_cancel=None,
+                          on_error=None):
+    """
+    Run worker over sentences on the shared executor with at most
+    `concurrency` sentences in flight.
+    
+    Args:
+        sentences: List of sentences (or batches of sentences) to process
+        worker: Callable taking one item of sentences and returning its result
+        concurrency: Maximum number of items processed at once
+        ordered: If True, yield results in sentence order; otherwise yield
+            them as they complete
+        heartbeat: If set, yield None after this many seconds without a result
+        on_cancel: Called with the items that were never processed if the
+            pipeline is closed early (e.g. the client disconnected)
+        on_error: Called with the exception and the items that were never
+            processed if a worker raised
+        
+    Yields:
+        tuple: (index into sentences, result), or None as a heartbeat
+    """
+    pending = deque()  # Futures in submission order
+    in_flight = set()
+    next_index = 0
+    cancelled = False
+    error = None
+    
+    try:
+        while next_index < len(sentences) or in_flight:
+            # API pacing is left to the rate limiter, so fill the window right away
+            while next_index < len(sentences) and len(in_flight) < concurrency:
+                future = sentence_executor.submit(worker, sentences[next_index])
+                future.index = next_index
+                pending.append(future)
+                in_flight.add(future)
+                next_index += 1
+            
+            if ordered:
+                wait([pending[0]], timeout=heartbeat)
+                if not pending[0].done():
+                    yield None
+                while pending and pending[0].done():
+                    future = pending.popleft()
+                    in_flight.discard(future)
+                    yield future.index, future.result()
+            else:
+                done, _ = wait(in_flight, timeout=heartbeat, return_when=FIRST_COMPLETED)
+                if not done:
+                    yield None
+                for future in sorted(done, key=lambda f: f.index):
+                    in_flight.discard(future)
+                    pending.remove(future)
+                    yield future.index, future.result()
+    except GeneratorExit:
+        # Closed by the consumer, e.g. because the client went away
+        cancelled = True
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Drop anything not yet started
+        skipped = [sentences[future.index] for future in in_flight if future.cancel()]
+        skipped.extend(sentences[next_index:])
+        if skipped and cancelled and on_cancel is not None:
+            on_cancel(skipped)
+        elif error is not None and on_error is not None:
+            on_error(error, skipped)
+
+def sentence_hash(sentence, source_lang, target_lang):
+    """Short content hash identifying a sentence's result for the client"""
+    return make_key(normalize_sentence(sentence), source_lang, target_lang)[:16]
+
+def plan_sentences(sentences, source_lang, target_lang, known_hashes=None):
+    """
+    Hash every sentence and pick the ones the client does not hold yet.
+    
+    Args:
+        sentences: The sentences of the submitted text
+        known_hashes: Hashes of results the client already has, or None
+        
+    Returns:
+        tuple: (hash of each sentence, indices of the sentences to process)
+    """
+    hashes = [sentence_hash(sentence, source_lang, target_lang) for sentence in sentences]
+    known = {h for h in known_hashes if isinstance(h, str)} if isinstance(known_hashes, list) else set()
+    todo = [i for i, h in enumerate(hashes) if h not in known]
+    if len(todo) < len(sentences):
+        with pipeline_stats_lock:
+            pipeline_stats['reused_sentences'] += len(sentences) - len(todo)
+    return hashes, todo
+
+def record_cancelled(count):
+    with pipeline_stats_lock:
+        pipeline_stats['cancelled_sentences'] += count
+    print(f"Client disconnected, cancelled {count} sentences")
+
+def record_pipeline_error(error, count):
+    with pipeline_stats_lock:
+        pipeline_stats['failed_streams'] += 1
+        pipeline_stats['dropped_sentences'] += count
+    print(f"Error processing sentences, dropped {count} unstarted sentences: {error}")
+
+def find_job(job_id, owner):
+    """The job with this id if it belongs to owner"""
+    job = job_store.get(job_id)
+    if job is None or job['owner'] != owner:
+        return None
+    return job
+
+def job_status(job):
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'total': job['total'],
+        'done': job['done'],
+        'error': job['error'],
+        'sourceLang': job['source_lang'],
+        'targetLang': job['target_lang'],
+    }
+
+def get_page(args):
+    """Read offset and limit query parameters for a results page"""
+    try:
+        offset = max(0, int(args.get('offset', 0)))
+        limit = max(1, min(int(args.get('limit', JOB_PAGE_SIZE)), 1000))
+    except ValueError:
+        offset, limit = 0, JOB_PAGE_SIZE
+    return offset, limit
+
+def get_history_cursor(args, name):
+    """Read a history cursor (an entry id, or None) and a page size from query parameters"""
+    try:
+        cursor = int(args[name]) if args.get(name) else None
+        limit = max(1, min(int(args.get('limit', HISTORY_PAGE_SIZE)), 100))
+    except ValueError:
+        cursor, limit = None, HISTORY_PAGE_SIZE
+    return cursor, limit
+
+def job_results_page(job, offset, limit):
+    rows = job_store.results(job['id'], offset, limit)
+    return dict(job_status(job), offset=offset, next=offset + len(rows),
+                results=[dict(result, index=index) if result is not None else None for index, result in rows])
+
+def segment_job(job_id, chunks, source_lang):
+    """
+    Split a job's text into sentences as it is read, storing them in pages.
+    
+    Raises:
+        ValueError: If the text is longer than JOB_MAX_CHARS
+    """
+    count = 0
+    chars = 0
+    page = []
+    
+    def counted(chunks):
+        nonlocal chars
+        for chunk in chunks:
+            chars += len(chunk)
+            if chars > JOB_MAX_CHARS:
+                raise ValueError(f'Text is longer than {JOB_MAX_CHARS} characters')
+            yield chunk
+    
+    for sentence in iter_sentences(counted(chunks), source_lang):
+        if not sentence.strip():
+            continue
+        page.append(sentence)
+        if len(page) == JOB_PAGE_SIZE:
+            job_store.add_sentences(job_id, count, page)
+            count += len(page)
+            page = []
+    if page:
+        job_store.add_sentences(job_id, count, page)
+    job_store.mark_segmented(job_id)
+
+def decode_upload(stream, chunk_size=65536):
+    """
+    Decode an uploaded file as UTF-8 in chunks.
+    
+    Characters split across reads are completed by the next read, and a
+    truncated one at the very end is replaced rather than dropped.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def start_job(job_id, model, tenant):
+    """Queue a job on the job executor"""
+    stop = threading.Event()
+    with job_stops_lock:
+        job_stops[job_id] = stop
+    job_store.set_status(job_id, 'queued')
+    job_executor.submit(run_job, job_id, model, tenant, stop)
+
+def stop_job(job_id):
+    with job_stops_lock:
+        stop = job_stops.get(job_id)
+    if stop is not None:
+        stop.set()
+
+def run_job(job_id, model, tenant, stop):
+    """
+    Process a job's unfinished sentences, checkpointing every result.
+    
+    Failed sentences are left without a result, so resuming the job
+    retries them. A page in which every sentence fails (e.g. a revoked API
+    key) pauses the job instead of failing the rest of the document.
+    """
+    job = job_store.get(job_id)
+    if job is None or stop.is_set():
+        return
+    job_store.set_status(job_id, 'running')
+    source_lang, target_lang, batch_size = job['source_lang'], job['target_lang'], job['batch_size']
+    failed = 0
+    status, error = 'done', None
+    
+    def worker(batch):
+        if stop.is_set():
+            return batch, []
+        return batch, process_sentence_batch([sentence for _, sentence in batch], source_lang, target_lang, model, tenant)
+    
+    try:
+        after = -1
+        while not stop.is_set():
+            page = job_store.pending(job_id, after, JOB_PAGE_SIZE)
+            if not page:
+                break
+            after = page[-1][0]
+            batches = [page[i:i + batch_size] for i in range(0, len(page), batch_size)]
+            saved = 0
+            pipeline = run_sentence_pipeline(batches, worker, JOB_CONCURRENCY, ordered=False)
+            try:
+                for _, (batch, results) in pipeline:
+                    good = [(index, result) for (index, _), result in zip(batch, results)
+                            if result.get('fluentTranslation') != TRANSLATION_ERROR]
+                    job_store.save_results(job_id, good)
+                    saved += len(good)
+                    failed += len(results) - len(good)
+                    if stop.is_set():
+                        break
+            finally:
+                pipeline.close()
+            if not saved and not stop.is_set():
+                status, error = 'paused', 'Every sentence in a page failed; check the API key and resume the job'
+                break
+        if stop.is_set():
+            status, error = 'cancelled', None
+        elif status == 'done' and failed:
+            status, error = 'paused', f'{failed} sentences failed; resume the job to retry them'
+    except Exception as e:
+        print(f"Error running job {job_id}: {e}")
+        status, error = 'failed', str(e)
+    finally:
+        with job_stops_lock:
+            if job_stops.get(job_id) is stop:
+                del job_stops[job_id]
+    if job_store.get(job_id) is not None:
+        job_store.set_status(job_id, status, error)
+
+def follow_job(job_id, offset):
+    """
+    Yield a job's results in order from offset, waiting for unfinished
+    sentences while the job runs, and None as a heartbeat while waiting.
+    """
+    last_item = time.monotonic()
+    while True:
+        items, running = read_job_progress(job_id, offset)
+        yield from items
+        if items:
+            offset = items[-1]['index'] + 1
+            last_item = time.monotonic()
+            if len(items) == JOB_PAGE_SIZE:
+                continue
+        if not running:
+            return
+        if time.monotonic() - last_item >= HEARTBEAT_INTERVAL:
+            last_item = time.monotonic()
+            yield None
+        time.sleep(1)
+
+def read_job_progress(job_id, offset):
+    """
+    The results ready from offset on, up to the first unfinished sentence.
+    
+    Returns:
+        tuple: (list of results with their index, whether the job is still running)
+    """
+    # Read the status first, so a finished job's results are all on disk
+    job = job_store.get(job_id)
+    if job is None:
+        return [], False
+    items = []
+    for index, result in job_store.results(job_id, offset, JOB_PAGE_SIZE):
+        if result is None:
+            break
+        items.append(dict(result, index=index))
+    return items, job['status'] in UNFINISHED_JOB_STATES
 
 def split_into_sentences(text, language=None):
     # Define language-specific sentence ending patterns
@@ -379,258 +1510,27 @@ def split_into_sentences(text, language=None):
     
     return result
 
-def get_language_name(code):
-    languages = {
-        'ab': 'Abkhaz',
-        'ace': 'Acehnese',
-        'ach': 'Acholi',
-        'aa': 'Afar',
-        'af': 'Afrikaans',
-        'sq': 'Albanian',
-        'alr': 'Alur',
-        'am': 'Amharic',
-        'ar': 'Arabic',
-        'hy': 'Armenian',
-        'as': 'Assamese',
-        'av': 'Avar',
-        'awa': 'Awadhi',
-        'ay': 'Aymara',
-        'az': 'Azerbaijani',
-        'ban': 'Balinese',
-        'bal': 'Baluchi',
-        'bm': 'Bambara',
-        'bci': 'Baoulé',
-        'ba': 'Bashkir',
-        'eu': 'Basque',
-        'btk': 'Batak Karo',
-        'bts': 'Batak Simalungun',
-        'tbw': 'Batak Toba',
-        'be': 'Belarusian',
-        'bem': 'Bemba',
-        'bn': 'Bengali',
-        'bew': 'Betawi',
-        'bho': 'Bhojpuri',
-        'bik': 'Bikol',
-        'bs': 'Bosnian',
-        'br': 'Breton',
-        'bg': 'Bulgarian',
-        'bua': 'Buryat',
-        'yue': 'Cantonese',
-        'ca': 'Catalan',
-        'ceb': 'Cebuano',
-        'ch': 'Chamorro',
-        'ce': 'Chechen',
-        'ny': 'Chichewa',
-        'zh-Hans': 'Chinese (Simplified)',
-        'zh-Hant': 'Chinese (Traditional)',
-        'chk': 'Chuukese',
-        'cv': 'Chuvash',
-        'co': 'Corsican',
-        'crh': 'Crimean Tatar (Cyrillic)',
-        'crh-Latn': 'Crimean Tatar (Latin)',
-        'hr': 'Croatian',
-        'cs': 'Czech',
-        'da': 'Danish',
-        'prs': 'Dari',
-        'dv': 'Dhivehi',
-        'din': 'Dinka',
-        'doi': 'Dogri',
-        'dug': 'Dombe',
-        'nl': 'Dutch',
-        'dyu': 'Dyula',
-        'dz': 'Dzongkha',
-        'en': 'English',
-        'eo': 'Esperanto',
-        'et': 'Estonian',
-        'ee': 'Ewe',
-        'fo': 'Faroese',
-        'fj': 'Fijian',
-        'fil': 'Filipino',
-        'fi': 'Finnish',
-        'fon': 'Fon',
-        'fr': 'French',
-        'fr-CA': 'French (Canada)',
-        'fy': 'Frisian',
-        'fur': 'Friulian',
-        'ff': 'Fulani',
-        'gaa': 'Ga',
-        'gl': 'Galician',
-        'ka': 'Georgian',
-        'de': 'German',
-        'el': 'Greek',
-        'gn': 'Guarani',
-        'gu': 'Gujarati',
-        'ht': 'Haitian Creole',
-        'hak': 'Hakha Chin',
-        'ha': 'Hausa',
-        'haw': 'Hawaiian',
-        'he': 'Hebrew',
-        'hil': 'Hiligaynon',
-        'hi': 'Hindi',
-        'hmn': 'Hmong',
-        'hu': 'Hungarian',
-        'hrx': 'Hunsrik',
-        'iba': 'Iban',
-        'is': 'Icelandic',
-        'ig': 'Igbo',
-        'ilo': 'Ilocano',
-        'id': 'Indonesian',
-        'iu': 'Inuktut (Latin)',
-        'iu-Syll': 'Inuktut (Syllabics)',
-        'ga': 'Irish',
-        'it': 'Italian',
-        'jam': 'Jamaican Patois',
-        'ja': 'Japanese',
-        'jv': 'Javanese',
-        'kac': 'Jingpo',
-        'kl': 'Kalaallisut',
-        'kn': 'Kannada',
-        'kr': 'Kanuri',
-        'pam': 'Kapampangan',
-        'kk': 'Kazakh',
-        'kha': 'Khasi',
-        'km': 'Khmer',
-        'ki': 'Kiga',
-        'kg': 'Kikongo',
-        'rw': 'Kinyarwanda',
-        'ktu': 'Kituba',
-        'trp': 'Kokborok',
-        'kv': 'Komi',
-        'kok': 'Konkani',
-        'ko': 'Korean',
-        'kri': 'Krio',
-        'ku': 'Kurdish (Kurmanji)',
-        'ckb': 'Kurdish (Sorani)',
-        'ky': 'Kyrgyz',
-        'lo': 'Lao',
-        'ltg': 'Latgalian',
-        'la': 'Latin',
-        'lv': 'Latvian',
-        'lij': 'Ligurian',
-        'li': 'Limburgish',
-        'ln': 'Lingala',
-        'lt': 'Lithuanian',
-        'lmo': 'Lombard',
-        'lg': 'Luganda',
-        'luo': 'Luo',
-        'lb': 'Luxembourgish',
-        'mk': 'Macedonian',
-        'mad': 'Madurese',
-        'mai': 'Maithili',
-        'mak': 'Makassar',
-        'mg': 'Malagasy',
-        'ms': 'Malay',
-        'ms-Arab': 'Malay (Jawi)',
-        'ml': 'Malayalam',
-        'mt': 'Maltese',
-        'mam': 'Mam',
-        'gv': 'Manx',
-        'mi': 'Maori',
-        'mr': 'Marathi',
-        'mh': 'Marshallese',
-        'mfe': 'Mauritian Creole',
-        'mhr': 'Meadow Mari',
-        'mni': 'Meiteilon (Manipuri)',
-        'min': 'Minang',
-        'lus': 'Mizo',
-        'mn': 'Mongolian',
-        'my': 'Myanmar (Burmese)',
-        'nah': 'Nahuatl (Eastern Huasteca)',
-        'ndc': 'Ndau',
-        'nr': 'Ndebele (South)',
-        'new': 'Nepalbhasa (Newari)',
-        'ne': 'Nepali',
-        'nqo': 'NKo',
-        'no': 'Norwegian (Bokmål)',
-        'nus': 'Nuer',
-        'oc': 'Occitan',
-        'or': 'Odia (Oriya)',
-        'om': 'Oromo',
-        'os': 'Ossetian',
-        'pag': 'Pangasinan',
-        'pap': 'Papiamento',
-        'ps': 'Pashto',
-        'fa': 'Persian',
-        'pl': 'Polish',
-        'pt-BR': 'Portuguese (Brazil)',
-        'pt-PT': 'Portuguese (Portugal)',
-        'pa': 'Punjabi (Gurmukhi)',
-        'pa-Arab': 'Punjabi (Shahmukhi)',
-        'qu': 'Quechua',
-        'kek': 'Qʼeqchiʼ',
-        'rom': 'Romani',
-        'ro': 'Romanian',
-        'rn': 'Rundi',
-        'ru': 'Russian',
-        'se': 'Sami (North)',
-        'sm': 'Samoan',
-        'sg': 'Sango',
-        'sa': 'Sanskrit',
-        'sat': 'Santali (Latin)',
-        'sat-Olck': 'Santali (Ol Chiki)',
-        'gd': 'Scots Gaelic',
-        'nso': 'Sepedi',
-        'sr': 'Serbian',
-        'st': 'Sesotho',
-        'crs': 'Seychellois Creole',
-        'shn': 'Shan',
-        'sn': 'Shona',
-        'scn': 'Sicilian',
-        'szl': 'Silesian',
-        'sd': 'Sindhi',
-        'si': 'Sinhala',
-        'sk': 'Slovak',
-        'sl': 'Slovenian',
-        'so': 'Somali',
-        'es': 'Spanish',
-        'su': 'Sundanese',
-        'sus': 'Susu',
-        'sw': 'Swahili',
-        'ss': 'Swati',
-        'sv': 'Swedish',
-        'ty': 'Tahitian',
-        'tg': 'Tajik',
-        'ber': 'Tamazight',
-        'ber-Tfng': 'Tamazight (Tifinagh)',
-        'ta': 'Tamil',
-        'tt': 'Tatar',
-        'te': 'Telugu',
-        'tet': 'Tetum',
-        'th': 'Thai',
-        'bo': 'Tibetan',
-        'ti': 'Tigrinya',
-        'tiv': 'Tiv',
-        'tpi': 'Tok Pisin',
-        'to': 'Tongan',
-        'lua': 'Tshiluba',
-        'ts': 'Tsonga',
-        'tn': 'Tswana',
-        'tcy': 'Tulu',
-        'tum': 'Tumbuka',
-        'tr': 'Turkish',
-        'tk': 'Turkmen',
-        'tyv': 'Tuvan',
-        'tw': 'Twi',
-        'udm': 'Udmurt',
-        'uk': 'Ukrainian',
-        'ur': 'Urdu',
-        'ug': 'Uyghur',
-        'uz': 'Uzbek',
-        've': 'Venda',
-        'vec': 'Venetian',
-        'vi': 'Vietnamese',
-        'war': 'Waray',
-        'cy': 'Welsh',
-        'wo': 'Wolof',
-        'xh': 'Xhosa',
-        'sah': 'Yakut',
-        'yi': 'Yiddish',
-        'yo': 'Yoruba',
-        'yua': 'Yucatec Maya',
-        'zap': 'Zapotec',
-        'zu': 'Zulu'
-    }
-    return languages.get(code, code)
+def iter_sentences(chunks, language=None):
+    """
+    Streaming split_into_sentences: split text arriving in chunks without
+    holding all of it, yielding each sentence once the text after it has
+    arrived (the last piece of a chunk may still be incomplete).
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        sentences = split_into_sentences(buffer, language)
+        if len(sentences) <= 1 and len(buffer) > 20000:
+            # No sentence break in sight; flush rather than grow without bound
+            yield from sentences
+            buffer = ''
+            continue
+        # Keep the trailing piece, including its leading whitespace, for the next chunk
+        tail = sentences[-1] if sentences else ''
+        cut = buffer.rfind(tail) if tail else len(buffer)
+        yield from sentences[:-1]
+        buffer = buffer[cut:]
+    yield from split_into_sentences(buffer, language)
 
 if __name__ == '__main__':
     # Ensure the paid emails file exists
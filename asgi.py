@@ -0,0 +1,422 @@
+"""
+Async (ASGI) serving mode for LinguaLens.
+
+Serves the same routes as app.py, but /process and /grammar-explanation run
+on asyncio with the SDK's async generation calls, so a waiting stream costs
+a coroutine instead of a worker thread. SQLite stores and the SDK import
+are only used through asyncio.to_thread, so they never block the loop.
+Install requirements-asgi.txt and run it with an ASGI server, e.g.:
+
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from functools import wraps
+
+from quart import Quart, request, Response, jsonify, session, redirect, url_for
+
+import app as lingualens
+import metrics
+from assets import gzip_stream_async, negotiate_encoding
+from gemini_client import gemini_clients, model_scheduler, ModelRequest, client_for, deadline_for, run_model_steps_async
+
+asgi_app = Quart(__name__)
+# Same secret as the Flask app, so sessions work in either serving mode
+asgi_app.secret_key = lingualens.app.secret_key
+
+def login_required(f):
+    """Decorator to require login for routes"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if 'verified_email' not in session:
+            return redirect(url_for('verification_page'))
+        return await f(*args, **kwargs)
+    return decorated_function
+
+@asgi_app.route('/')
+async def verification_page():
+    """Show the verification page when accessing the root URL"""
+    if 'verified_email' in session:
+        return redirect(url_for('app_page'))
+
+    return serve_asset('verify')
+
+@asgi_app.route('/app')
+@login_required
+async def app_page():
+    """Main application page, requires login"""
+    return serve_asset('index')
+
+async def get_model(api_key):
+    """The client for api_key; creating one may import the SDK, so it runs off the event loop"""
+    return await asyncio.to_thread(gemini_clients.get, api_key, lingualens.MODEL_NAME)
+
+def serve_asset(name):
+    asset = lingualens.page_assets.get(name)
+    status, body, headers = asset.respond(request.headers.get('Accept-Encoding'),
+                                          request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers, mimetype=asset.mimetype)
+
+def ndjson_response(chunks):
+    if lingualens.COMPRESS_STREAMS and negotiate_encoding(request.headers.get('Accept-Encoding'), ('gzip',)) == 'gzip':
+        return Response(gzip_stream_async(chunks), mimetype='application/json',
+                        headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(chunks, mimetype='application/json')
+
+@asgi_app.route('/verify-email', methods=['POST'])
+async def verify_email():
+    """Verify if an email is in the paid list"""
+    data = await request.get_json()
+    email = data.get('email', '').strip()
+
+    if await asyncio.to_thread(lingualens.is_email_verified, email):
+        session['verified_email'] = email
+        return jsonify({'verified': True})
+    else:
+        return jsonify({'verified': False})
+
+@asgi_app.route('/process', methods=['POST'])
+@login_required
+async def process_text():
+    data = await request.get_json()
+
+    if not data or 'text' not in data:
+        return jsonify({'error': 'No text provided'}), 400
+
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+
+    model = await get_model(api_key)
+
+    text = data['text']
+    source_lang = data.get('sourceLang', 'fr')
+    target_lang = data.get('targetLang', 'en')
+    sentences = [s for s in lingualens.split_into_sentences(text, source_lang) if s.strip()]
+    incremental = isinstance(data.get('knownHashes'), list)
+    hashes, todo = lingualens.plan_sentences(sentences, source_lang, target_lang, data.get('knownHashes'))
+
+    ordered = data.get('ordered', True)
+    concurrency = lingualens.get_concurrency(data.get('concurrency'))
+    batch_size = lingualens.get_batch_size(data.get('batchSize'))
+    batches = [[sentences[i] for i in todo[n:n + batch_size]] for n in range(0, len(todo), batch_size)]
+    tenant = session.get('verified_email')
+    prefetch = lingualens.GRAMMAR_PREFETCH and data.get('prefetchGrammar', True) is not False
+
+    async def generate():
+        async def worker(batch):
+            key = lingualens.flight_key(batch, source_lang, target_lang, model.model_name)
+            return await lingualens.sentence_flights.do_async(key, lambda: run_model_steps_async(
+                lingualens.process_sentence_batch_steps(batch, source_lang, target_lang, model.model_name), model, tenant),
+                shareable=lingualens.translated)
+
+        def on_cancel(skipped):
+            lingualens.record_cancelled(sum(len(batch) for batch in skipped))
+
+        def on_error(error, skipped):
+            lingualens.record_pipeline_error(error, sum(len(batch) for batch in skipped))
+
+        if incremental:
+            yield json.dumps({'hashes': hashes}) + '\n'
+
+        pipeline = run_sentence_pipeline(batches, worker, concurrency, ordered,
+                                         heartbeat=lingualens.HEARTBEAT_INTERVAL, on_cancel=on_cancel, on_error=on_error)
+        try:
+            async for item in pipeline:
+                if item is None:
+                    yield '\n'
+                    continue
+                batch_index, results = item
+                for offset, result in enumerate(results):
+                    index = todo[batch_index * batch_size + offset]
+                    result = dict(result, hash=hashes[index])
+                    if not ordered or incremental:
+                        result['index'] = index
+                    yield json.dumps(result) + '\n'
+                    if prefetch:
+                        await asyncio.to_thread(lingualens.prefetch_grammar, result['original'], source_lang,
+                                                target_lang, model, api_key, tenant)
+        finally:
+            await pipeline.aclose()
+
+    return ndjson_response(generate())
+
+@asgi_app.route('/grammar-explanation', methods=['POST'])
+@login_required
+async def get_grammar_explanation():
+    data = await request.get_json()
+
+    if not data or 'sentence' not in data:
+        return jsonify({'error': 'No sentence provided'}), 400
+
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+
+    model = await get_model(api_key)
+
+    sentence = data['sentence']
+    source_lang = data.get('sourceLang', 'fr')
+    target_lang = data.get('targetLang', 'en')
+    if lingualens.GRAMMAR_PREFETCH:
+        lingualens.grammar_prefetcher.record_request(
+            lingualens.grammar_cache_key(sentence, source_lang, target_lang, model.model_name))
+
+    return Response(
+        stream_grammar_explanation(sentence, source_lang, target_lang, model, session.get('verified_email')),
+        mimetype='text/plain; charset=utf-8'
+    )
+
+@asgi_app.route('/jobs', methods=['POST'])
+@login_required
+async def create_job():
+    """Start a background translation job; see app.create_job"""
+    files = await request.files
+    if files.get('file'):
+        data = await request.form
+        chunks = lingualens.decode_upload(files['file'].stream)
+    else:
+        data = await request.get_json(silent=True) or {}
+        if 'text' not in data:
+            return jsonify({'error': 'No text provided'}), 400
+        chunks = [data['text']]
+
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+
+    model = await get_model(api_key)
+    source_lang = data.get('sourceLang', 'fr')
+    target_lang = data.get('targetLang', 'en')
+    tenant = session.get('verified_email')
+
+    job_id = await asyncio.to_thread(lingualens.job_store.create, tenant, source_lang, target_lang,
+                                     lingualens.get_batch_size(data.get('batchSize')))
+    try:
+        # Segmenting reads the upload and writes SQLite, so keep it off the event loop
+        await asyncio.to_thread(lingualens.segment_job, job_id, chunks, source_lang)
+    except ValueError as e:
+        await asyncio.to_thread(lingualens.job_store.delete, job_id)
+        return jsonify({'error': str(e)}), 413
+    except Exception:
+        await asyncio.to_thread(lingualens.job_store.delete, job_id)
+        raise
+
+    await asyncio.to_thread(lingualens.start_job, job_id, model, tenant)
+    return jsonify(lingualens.job_status(await asyncio.to_thread(lingualens.job_store.get, job_id))), 202
+
+@asgi_app.route('/jobs/<job_id>')
+@login_required
+async def get_job(job_id):
+    job = await asyncio.to_thread(lingualens.find_job, job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(lingualens.job_status(job))
+
+@asgi_app.route('/jobs/<job_id>/results')
+@login_required
+async def get_job_results(job_id):
+    job = await asyncio.to_thread(lingualens.find_job, job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    offset, limit = lingualens.get_page(request.args)
+    return jsonify(await asyncio.to_thread(lingualens.job_results_page, job, offset, limit))
+
+@asgi_app.route('/jobs/<job_id>/stream')
+@login_required
+async def stream_job(job_id):
+    job = await asyncio.to_thread(lingualens.find_job, job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    offset, _ = lingualens.get_page(request.args)
+
+    async def generate():
+        # Async counterpart of app.follow_job
+        nonlocal offset
+        last_item = time.monotonic()
+        while True:
+            items, running = await asyncio.to_thread(lingualens.read_job_progress, job_id, offset)
+            for item in items:
+                yield json.dumps(item) + '\n'
+            if items:
+                offset = items[-1]['index'] + 1
+                last_item = time.monotonic()
+                if len(items) == lingualens.JOB_PAGE_SIZE:
+                    continue
+            if not running:
+                return
+            if time.monotonic() - last_item >= lingualens.HEARTBEAT_INTERVAL:
+                last_item = time.monotonic()
+                yield '\n'
+            await asyncio.sleep(1)
+
+    return ndjson_response(generate())
+
+@asgi_app.route('/jobs/<job_id>/resume', methods=['POST'])
+@login_required
+async def resume_job(job_id):
+    job = await asyncio.to_thread(lingualens.find_job, job_id, session.get('verified_email'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    data = await request.get_json(silent=True) or {}
+    api_key = data.get('apiKey')
+    if not api_key:
+        return jsonify({'error': 'API key is required'}), 400
+    if job['status'] in lingualens.UNFINISHED_JOB_STATES:
+        return jsonify({'error': f"Job is {job['status']}"}), 409
+    if not job['segmented']:
+        return jsonify({'error': 'The text of this job was not read completely; create a new job'}), 409
+    await asyncio.to_thread(lingualens.start_job, job_id, await get_model(api_key), session.get('verified_email'))
+    return jsonify(lingualens.job_status(await asyncio.to_thread(lingualens.job_store.get, job_id))), 202
+
+@asgi_app.route('/jobs/<job_id>', methods=['DELETE'])
+@login_required
+async def delete_job(job_id):
+    if await asyncio.to_thread(lingualens.find_job, job_id, session.get('verified_email')) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    lingualens.stop_job(job_id)
+    await asyncio.to_thread(lingualens.job_store.delete, job_id)
+    return jsonify({'deleted': True})
+
+@asgi_app.route('/history', methods=['GET'])
+@login_required
+async def get_history():
+    before, limit = lingualens.get_history_cursor(request.args, 'before')
+    entries, cursor = await asyncio.to_thread(lingualens.history_store.page, session.get('verified_email'), before, limit)
+    return jsonify({'entries': entries, 'next': cursor})
+
+@asgi_app.route('/history', methods=['POST'])
+@login_required
+async def add_history():
+    data = await request.get_json(silent=True) or {}
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'No text provided'}), 400
+    if len(text) > lingualens.HISTORY_MAX_CHARS:
+        return jsonify({'error': f'Text is longer than {lingualens.HISTORY_MAX_CHARS} characters'}), 413
+    entry = await asyncio.to_thread(lingualens.history_store.append, session.get('verified_email'), text,
+                                    str(data.get('sourceLang', 'fr')), str(data.get('targetLang', 'en')))
+    return jsonify(entry), 201
+
+@asgi_app.route('/history/sync')
+@login_required
+async def sync_history():
+    after, limit = lingualens.get_history_cursor(request.args, 'after')
+    entries, more = await asyncio.to_thread(lingualens.history_store.since, session.get('verified_email'), after or 0, limit)
+    return jsonify({'entries': entries, 'more': more})
+
+@asgi_app.route('/stats')
+async def stats():
+    """Operational counters for the translation pipeline"""
+    return jsonify(await asyncio.to_thread(lingualens.collect_stats))
+
+@asgi_app.route('/ready')
+async def readiness():
+    """Readiness probe: 503 until the server can answer translation requests without a cold start"""
+    checks = lingualens.readiness_checks()
+    return jsonify({'ready': all(checks.values()), 'checks': checks}), 200 if all(checks.values()) else 503
+
+@asgi_app.route('/metrics')
+async def metrics_endpoint():
+    """Prometheus metrics: per-stage latency, tokens, parse failures and pipeline counters"""
+    stats = await asyncio.to_thread(lingualens.collect_stats)
+    return Response(metrics.registry.render(stats), mimetype='text/plain; version=0.0.4')
+
+@asgi_app.route('/logout')
+async def logout():
+    """Log out the user by clearing the session"""
+    session.pop('verified_email', None)
+    return redirect(url_for('verification_page'))
+
+async def stream_grammar_explanation(sentence, source_lang, target_lang, model, tenant=None):
+    """Async counterpart of app.stream_grammar_explanation"""
+    cache_key = lingualens.grammar_cache_key(sentence, source_lang, target_lang, model.model_name)
+    cached = await asyncio.to_thread(lingualens.grammar_cache.get, cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt = lingualens.build_grammar_prompt(sentence, source_lang, target_lang)
+    request = ModelRequest('grammar', prompt, source_lang, target_lang, model=lingualens.STAGE_MODELS['grammar'])
+    chunks = []
+    started = time.monotonic()
+
+    try:
+        client = client_for(model, request)
+        slot = lambda timeout: model_scheduler.slot_async(tenant, request.stage, timeout)
+        async with client.stream_content_async(prompt, deadline=deadline_for(request.stage), slot=slot) as response:
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield text
+    except Exception as e:
+        metrics.record_model_call(request, time.monotonic() - started, error=e)
+        print(f"Error generating grammar explanation: {e}")
+        yield "\n\nUnable to generate grammar explanation. Please try again."
+        return
+
+    metrics.record_model_call(request, time.monotonic() - started, response)
+
+    if chunks:
+        await asyncio.to_thread(lingualens.grammar_cache.set, cache_key, ''.join(chunks))
+
+async def run_sentence_pipeline(sentences, worker, concurrency, ordered=True, heartbeat=None, on_cancel=None,
+                                on_error=None):
+    """
+    Async counterpart of app.run_sentence_pipeline.
+
+    Each item runs as an asyncio task, so closing the pipeline cancels
+    in-flight model calls as well as the items not yet started.
+
+    Yields:
+        tuple: (index into sentences, result), or None as a heartbeat
+    """
+    pending = deque()  # Tasks in submission order
+    in_flight = set()
+    next_index = 0
+    cancelled = False
+    error = None
+
+    try:
+        while next_index < len(sentences) or in_flight:
+            while next_index < len(sentences) and len(in_flight) < concurrency:
+                task = asyncio.ensure_future(worker(sentences[next_index]))
+                task.index = next_index
+                pending.append(task)
+                in_flight.add(task)
+                next_index += 1
+
+            if ordered:
+                await asyncio.wait([pending[0]], timeout=heartbeat)
+                if not pending[0].done():
+                    yield None
+                while pending and pending[0].done():
+                    task = pending.popleft()
+                    in_flight.discard(task)
+                    yield task.index, task.result()
+            else:
+                done, _ = await asyncio.wait(in_flight, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    yield None
+                for task in sorted(done, key=lambda t: t.index):
+                    in_flight.discard(task)
+                    pending.remove(task)
+                    yield task.index, task.result()
+    except (GeneratorExit, asyncio.CancelledError):
+        # Closed by the consumer or cancelled with it, e.g. because the client went away
+        cancelled = True
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Stop everything still running
+        skipped = [sentences[task.index] for task in in_flight if task.cancel()]
+        skipped.extend(sentences[next_index:])
+        if skipped and cancelled and on_cancel is not None:
+            on_cancel(skipped)
+        elif error is not None and on_error is not None:
+            on_error(error, skipped)
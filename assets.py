@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: without it pages are offered gzip-compressed only
+    brotli = None
+
+# Encodings we keep precompressed copies in, in order of preference
+ENCODINGS = ('br', 'gzip')
+
+class StaticAsset:
+    """
+    A page read once, with precompressed copies and a content-hash ETag.
+
+    Each encoding is a separate representation with its own ETag, so caches
+    never hand a gzip body to a client that asked for brotli.
+    """
+
+    def __init__(self, path, mimetype):
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.path = path
+        self.mimetype = mimetype
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+        self.etags = {encoding: f'"{digest}-{encoding}"' if encoding != 'identity' else f'"{digest}"'
+                      for encoding in self.bodies}
+
+    def respond(self, accept_encoding, if_none_match):
+        """
+        Pick the representation for a request.
+
+        Args:
+            accept_encoding: The request's Accept-Encoding header, or None
+            if_none_match: The request's If-None-Match header, or None
+
+        Returns:
+            tuple: (status, body, headers); the body is empty for a 304
+        """
+        encoding = negotiate_encoding(accept_encoding, self.bodies)
+        etag = self.etags[encoding]
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            # Pages sit behind the login check, so shared caches must not keep them
+            'Cache-Control': 'private, no-cache',
+        }
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        if etag_matches(if_none_match, etag):
+            return 304, b'', headers
+        return 200, self.bodies[encoding], headers
+
+    def stats(self):
+        return {f'{encoding}_bytes': len(body) for encoding, body in self.bodies.items()}
+
+class AssetStore:
+    """Pages served by the app, read and compressed once when it starts"""
+
+    def __init__(self, pages):
+        # name -> (path, mimetype)
+        self.assets = {name: StaticAsset(path, mimetype) for name, (path, mimetype) in pages.items()}
+
+    def get(self, name):
+        return self.assets[name]
+
+    def stats(self):
+        return {name: asset.stats() for name, asset in self.assets.items()}
+
+def negotiate_encoding(accept_encoding, available=ENCODINGS):
+    """
+    Choose the preferred encoding the client accepts.
+
+    Returns:
+        str: One of ENCODINGS present in available, or 'identity'
+    """
+    if not accept_encoding:
+        return 'identity'
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+def gzip_stream(chunks):
+    """
+    Gzip a stream of text chunks, flushing after each one.
+
+    Every chunk (an NDJSON line or a keep-alive) is decodable as soon as it
+    arrives. Closing the returned generator closes chunks too, so a client
+    disconnect still cancels the work behind the stream.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        chunks.close()
+
+async def gzip_stream_async(chunks):
+    """Async counterpart of gzip_stream()"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    try:
+        async for chunk in chunks:
+            yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        await chunks.aclose()
@@ -0,0 +1,49 @@
+# Short passages in several scripts; build_text repeats them to the requested size
+PASSAGES = {
+    'fr': (
+        "Le petit chat dort sur le canapé. Il fait beau aujourd'hui, alors nous allons au parc. "
+        "Ma sœur lit un livre très intéressant. Est-ce que tu veux du café ou du thé? "
+        "Nous avons visité Paris l'été dernier, et c'était magnifique!"
+    ),
+    'ru': (
+        "Маленький кот спит на диване. Сегодня хорошая погода, поэтому мы идём в парк. "
+        "Моя сестра читает очень интересную книгу. Ты хочешь кофе или чай? "
+        "Прошлым летом мы были в Москве, и это было прекрасно!"
+    ),
+    'el': (
+        "Η μικρή γάτα κοιμάται στον καναπέ. Σήμερα έχει ωραίο καιρό, γι' αυτό πάμε στο πάρκο. "
+        "Η αδερφή μου διαβάζει ένα πολύ ενδιαφέρον βιβλίο. Θέλεις καφέ ή τσάι?"
+    ),
+    'ar': (
+        "القطة الصغيرة نائمة على الأريكة. الطقس جميل اليوم، لذلك سنذهب إلى الحديقة. "
+        "أختي تقرأ كتابا مثيرا جدا. هل تريد قهوة أم شاي?"
+    ),
+    'ja': (
+        "小さな猫がソファで寝ています。今日は天気がいいので、公園に行きます。"
+        "姉はとても面白い本を読んでいます。コーヒーとお茶、どちらがいいですか？"
+    ),
+    'zh': (
+        "小猫在沙发上睡觉。今天天气很好，所以我们去公园。"
+        "我姐姐在看一本很有意思的书。你想喝咖啡还是茶？"
+    ),
+}
+
+def build_text(lang, sentences, unique=True):
+    """
+    Build a text of roughly `sentences` sentences from the passage for lang.
+
+    With unique=True each repetition gets a numeric prefix, so the sentence
+    cache does not turn the benchmark into a cache benchmark.
+    """
+    from app import split_into_sentences
+
+    base = split_into_sentences(PASSAGES[lang], lang)
+    separator = '' if lang in ('ja', 'zh') else ' '
+    parts = []
+    for i in range(sentences):
+        sentence = base[i % len(base)].strip()
+        repetition = i // len(base)
+        if unique and repetition:
+            sentence = f'{repetition}{separator or " "}{sentence}'
+        parts.append(sentence)
+    return separator.join(parts)
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions
+
+class FakeResponse:
+    """Just enough of GenerateContentResponse for the app: text and usage_metadata"""
+
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=(len(prompt) + len(text)) // 4,
+        )
+
+    def __iter__(self):
+        # Streaming: hand the text out in a few chunks
+        size = max(1, len(self.text) // 4)
+        for start in range(0, len(self.text), size):
+            yield SimpleNamespace(text=self.text[start:start + size])
+
+class FakeGeminiModel:
+    """
+    Offline stand-in for genai.GenerativeModel.
+
+    It answers the app's prompts with plausible output: romanizations, Birkenbihl
+    JSON (bare or fenced, single or batched), fallback word maps and grammar
+    Markdown. Latency, API errors, 429s, malformed JSON, stalls and words missing
+    from wordTranslations each happen at a configurable rate. A timeout passed in
+    request_options ends a slower call with DeadlineExceeded, as the SDK does.
+    When a call passes a response schema the JSON is never fenced and word maps
+    come back as lists of {word, translation} pairs, as the real API does.
+    """
+
+    def __init__(self, model_name='models/fake-gemini', latency=0.5, jitter=0.5, error_rate=0.0,
+                 rate_limit_rate=0.0, malformed_rate=0.0, fenced_rate=0.5, missing_word_rate=0.05,
+                 retry_delay=0.05, stall_rate=0.0, stall_latency=10.0, seed=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.fenced_rate = fenced_rate
+        self.missing_word_rate = missing_word_rate
+        self.retry_delay = retry_delay
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.calls_by_kind = {}
+        self.lock = threading.Lock()
+
+    def _prepare(self, prompt):
+        """Pick the simulated latency and outcome for one call"""
+        kind = classify_prompt(prompt)
+        with self.lock:
+            self.calls += 1
+            self.calls_by_kind[kind] = self.calls_by_kind.get(kind, 0) + 1
+            delay = max(0.0, self.random.gauss(self.latency, self.latency * self.jitter))
+            if self.random.random() < self.stall_rate:
+                delay = self.stall_latency
+            roll = self.random.random()
+            malformed = self.random.random() < self.malformed_rate
+            fenced = self.random.random() < self.fenced_rate
+            missing = [self.random.random() < self.missing_word_rate for _ in range(256)]
+        if roll < self.rate_limit_rate:
+            error = exceptions.ResourceExhausted(f"429 Quota exceeded. Please retry in {self.retry_delay}s")
+        elif roll < self.rate_limit_rate + self.error_rate:
+            error = exceptions.InternalServerError("500 An internal error has occurred")
+        else:
+            error = None
+        return kind, delay, error, malformed, fenced, missing
+
+    def generate_content(self, prompt, stream=False, generation_config=None, request_options=None, **kwargs):
+        kind, delay, error, malformed, fenced, missing = self._prepare(prompt)
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise exceptions.DeadlineExceeded("504 Deadline Exceeded")
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return FakeResponse(respond(kind, prompt, malformed, fenced, missing, generation_config), prompt)
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None, request_options=None,
+                                     **kwargs):
+        kind, delay, error, malformed, fenced, missing = self._prepare(prompt)
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise exceptions.DeadlineExceeded("504 Deadline Exceeded")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        response = FakeResponse(respond(kind, prompt, malformed, fenced, missing, generation_config), prompt)
+        if stream:
+            return AsyncChunks(list(response), response.usage_metadata)
+        return response
+
+class AsyncChunks:
+    def __init__(self, chunks, usage_metadata):
+        self.chunks = chunks
+        self.usage_metadata = usage_metadata
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+def classify_prompt(prompt):
+    if 'Analyze this' in prompt:
+        return 'grammar'
+    if 'romanized pronunciation guide for the following' in prompt:
+        return 'romanization'
+    if 'Translate each of these' in prompt or 'Translate the word' in prompt:
+        return 'word_fallback'
+    if 'Return a JSON array' in prompt:
+        return 'batch'
+    return 'sentence'
+
+# Models key wordTranslations by the word as it appears in the (romanized)
+# text, without the punctuation around it but with apostrophes inside it
+WORD_PUNCTUATION = '.,!?;:"\'-«»“”„‘’()[]¿¡…'
+
+def fake_translate(word):
+    cleaned = word.strip(WORD_PUNCTUATION)
+    return f'tr-{cleaned}' if cleaned else word
+
+def fake_romanize(sentence):
+    # One Latin token per whitespace-separated word keeps the word counts aligned
+    return ' '.join(f'rom{i}' for i, _ in enumerate(sentence.split())) or 'rom0'
+
+def as_pairs(word_map):
+    return [{'word': word, 'translation': translation} for word, translation in word_map.items()]
+
+def sentence_object(sentence, text_to_process, missing, romanization=None, structured=False):
+    words = text_to_process.split()
+    word_translations = {}
+    for i, word in enumerate(words):
+        cleaned = word.strip(WORD_PUNCTUATION)
+        if cleaned and not missing[i % len(missing)]:
+            word_translations[cleaned] = fake_translate(word)
+    result = {
+        'original': sentence,
+        'wordByWord': ' '.join(fake_translate(word) for word in words),
+        'fluentTranslation': f'Fluent translation of: {sentence}',
+        'wordTranslations': as_pairs(word_translations) if structured else word_translations,
+    }
+    if romanization is not None:
+        result['romanization'] = romanization
+    return result
+
+def encode(payload, malformed, fenced):
+    text = json.dumps(payload, ensure_ascii=False)
+    if malformed:
+        # Truncated output, as when the model stops early
+        text = text[:max(1, len(text) // 2)]
+    if fenced:
+        return f'Here is the result:\n```json\n{text}\n```'
+    return text
+
+def respond(kind, prompt, malformed, fenced, missing, generation_config=None):
+    # A response schema means JSON mode: no Markdown fences, maps as pair lists
+    structured = bool(generation_config and generation_config.get('response_schema'))
+    fenced = fenced and not structured
+    if kind == 'grammar':
+        sentence = re.search(r'"(.*)"', prompt)
+        sentence = sentence.group(1) if sentence else ''
+        return (f'1. **Structural Explanation**: "{sentence}" is a simple clause.\n'
+                '2. **Word-by-Word Translation**:\n- **word**: meaning\n'
+                '3. **Grammar Points**:\n| Pattern | Level | Frequency | Note |\n| SVO | A1 | High | - |\n')
+    if kind == 'romanization':
+        sentence = re.search(r'"(.*)"', prompt)
+        return fake_romanize(sentence.group(1) if sentence else '')
+    if kind == 'word_fallback':
+        words = re.findall(r'^\s*- "(.*)"$', prompt, re.MULTILINE)
+        word_map = {word: fake_translate(word) for word in words}
+        return encode(as_pairs(word_map) if structured else word_map, malformed, fenced)
+    if kind == 'batch':
+        # Sentences may come with the app's own romanization on the next line
+        sentences = re.findall(r'^\s*\d+\. "(.*)"$(?:\n\s*Romanized: "(.*)"$)?', prompt, re.MULTILINE)
+        romanized = 'romanization:' in prompt
+        items = []
+        for sentence, given in sentences:
+            romanization = fake_romanize(sentence) if romanized else None
+            items.append(sentence_object(sentence, given or romanization or sentence, missing, romanization, structured))
+        return encode(items, malformed, fenced)
+
+    sentence = re.search(r'Original sentence: "(.*)"', prompt)
+    text_to_process = re.search(r'Text to process: "(.*)"', prompt)
+    sentence = sentence.group(1) if sentence else ''
+    text_to_process = text_to_process.group(1) if text_to_process else sentence
+    romanization = re.search(r'Romanized sentence: "(.*)"', prompt)
+    return encode(sentence_object(sentence, text_to_process, missing,
+                                  romanization.group(1) if romanization else None, structured), malformed, fenced)
@@ -0,0 +1,198 @@
+"""
+Offline benchmark for the LinguaLens translation pipeline.
+
+Drives split_into_sentences(), process_sentence() and the /process endpoint
+against the fake Gemini backend in fake_gemini.py, so no API quota is spent.
+Run from the repository root:
+
+    python -m benchmarks.run --sentences 40 --latency 0.3 --concurrency 4
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark LinguaLens against a fake Gemini backend')
+    parser.add_argument('--corpus', nargs='+', default=['fr', 'ru', 'ja', 'zh', 'ar', 'el'],
+                        help='Corpora (source language codes) to run')
+    parser.add_argument('--sentences', type=int, default=20, help='Sentences per corpus')
+    parser.add_argument('--latency', type=float, default=0.2, help='Mean fake model latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Latency standard deviation as a fraction of the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls failing with a 429')
+    parser.add_argument('--malformed-rate', type=float, default=0.02, help='Fraction of JSON responses that are truncated')
+    parser.add_argument('--fenced-rate', type=float, default=0.5, help='Fraction of JSON responses wrapped in ```json fences')
+    parser.add_argument('--missing-word-rate', type=float, default=0.05, help='Fraction of words left out of wordTranslations')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrency sent to /process')
+    parser.add_argument('--batch-size', type=int, default=1, help='batchSize sent to /process')
+    parser.add_argument('--rate-limit', type=float, default=1e6,
+                        help='Requests per minute for the app rate limiter (default: effectively unlimited)')
+    parser.add_argument('--fast-model', default='',
+                        help='Model name for the fast tier (LINGUALENS_FAST_MODEL); empty disables it')
+    parser.add_argument('--fast-latency', type=float, default=None,
+                        help='Mean fake latency of the fast model (default: a third of --latency)')
+    parser.add_argument('--stall-rate', type=float, default=0.0,
+                        help='Fraction of calls that stall for --stall-latency seconds')
+    parser.add_argument('--stall-latency', type=float, default=10.0, help='How long a stalled call takes')
+    parser.add_argument('--hedge', action='store_true', help='Enable hedged model calls (LINGUALENS_HEDGE)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the fake backend')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    return parser.parse_args(argv)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+@contextlib.contextmanager
+def measured():
+    """Time a block and track its peak Python memory"""
+    stats = {}
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats['seconds'] = time.perf_counter() - started
+        stats['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Isolate the app's on-disk state and rate limits before it is imported
+    workdir = tempfile.mkdtemp(prefix='lingualens-bench-')
+    os.environ['LINGUALENS_CACHE_DB'] = os.path.join(workdir, 'cache.db')
+    os.environ['LINGUALENS_LEXICON_DB'] = os.path.join(workdir, 'lexicon.db')
+    os.environ['LINGUALENS_JOBS_DB'] = os.path.join(workdir, 'jobs.db')
+    os.environ['LINGUALENS_HISTORY_DB'] = os.path.join(workdir, 'history.db')
+    os.environ['LINGUALENS_RATE_LIMIT'] = str(args.rate_limit)
+    os.environ['LINGUALENS_RATE_LIMIT_MAX'] = str(max(args.rate_limit, 60))
+    os.environ['LINGUALENS_FAST_MODEL'] = args.fast_model
+    os.environ['LINGUALENS_HEDGE'] = '1' if args.hedge else '0'
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        from benchmarks.corpora import build_text
+        from benchmarks.fake_gemini import FakeGeminiModel
+
+    fakes = {}  # API key hash -> {model name: FakeGeminiModel}
+
+    def hash_key(api_key):
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    def model_factory(model_name, key_hash):
+        latency = args.latency
+        if args.fast_model and model_name == args.fast_model:
+            latency = args.fast_latency if args.fast_latency is not None else args.latency / 3
+        fake = fakes.setdefault(key_hash, {})[model_name] = FakeGeminiModel(
+            model_name=model_name, latency=latency, jitter=args.jitter, error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate, malformed_rate=args.malformed_rate,
+            fenced_rate=args.fenced_rate, missing_word_rate=args.missing_word_rate,
+            stall_rate=args.stall_rate, stall_latency=args.stall_latency, seed=args.seed
+        )
+        return fake
+
+    app.gemini_clients.model_factory = model_factory
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['verified_email'] = 'benchmark@localhost'
+
+    def reset():
+        app.sentence_cache.clear()
+        app.grammar_cache.clear()
+        app.lexicon.clear()
+
+    rows = []
+    for lang in args.corpus:
+        text = build_text(lang, args.sentences)
+
+        # split_into_sentences on a large text
+        big_text = build_text(lang, 2000)
+        with measured() as stats:
+            sentences = app.split_into_sentences(big_text, lang)
+        rows.append({
+            'corpus': lang, 'scenario': 'split_into_sentences', 'sentences': len(sentences),
+            'sentences_per_s': len(sentences) / stats['seconds'], 'chars_per_s': len(big_text) / stats['seconds'],
+            'peak_mb': stats['peak_mb'],
+        })
+
+        # process_sentence, one sentence at a time
+        reset()
+        sentences = [s for s in app.split_into_sentences(text, lang) if s.strip()]
+        api_key = f'bench-serial-{lang}'
+        model = app.gemini_clients.get(api_key, app.MODEL_NAME)
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()), measured() as stats:
+            for sentence in sentences:
+                started = time.perf_counter()
+                app.process_sentence(sentence, lang, 'en', model)
+                latencies.append(time.perf_counter() - started)
+        rows.append(report_row(lang, 'process_sentence', sentences, stats, latencies, fakes[hash_key(api_key)]))
+
+        # /process end to end, streamed
+        reset()
+        api_key = f'bench-process-{lang}'
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()), measured() as stats:
+            started = time.perf_counter()
+            response = client.post('/process', json={
+                'text': text, 'sourceLang': lang, 'targetLang': 'en', 'apiKey': api_key,
+                'ordered': False, 'concurrency': args.concurrency, 'batchSize': args.batch_size,
+            }, buffered=False)
+            buffer = b''
+            for chunk in response.response:
+                buffer += chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+                while b'\n' in buffer:
+                    line, buffer = buffer.split(b'\n', 1)
+                    if line.strip():
+                        latencies.append(time.perf_counter() - started)
+            response.close()
+        rows.append(report_row(lang, 'process_text', sentences, stats, latencies, fakes[hash_key(api_key)]))
+
+    if args.json:
+        print(json.dumps({'args': vars(args), 'results': rows}, indent=2))
+    else:
+        print_table(rows, args)
+
+def report_row(lang, scenario, sentences, stats, latencies, models):
+    calls = sum(fake.calls for fake in models.values())
+    calls_by_kind = {}
+    for fake in models.values():
+        for kind, count in fake.calls_by_kind.items():
+            calls_by_kind[kind] = calls_by_kind.get(kind, 0) + count
+    return {
+        'corpus': lang, 'scenario': scenario, 'sentences': len(sentences),
+        'sentences_per_s': len(sentences) / stats['seconds'] if stats['seconds'] else 0.0,
+        'p50_s': percentile(latencies, 0.5), 'p99_s': percentile(latencies, 0.99),
+        'api_calls_per_sentence': calls / len(sentences) if sentences else 0.0,
+        'calls_by_kind': calls_by_kind,
+        'calls_by_model': {name: fake.calls for name, fake in models.items()},
+        'peak_mb': stats['peak_mb'],
+    }
+
+def print_table(rows, args):
+    print(f"fake latency {args.latency}s, errors {args.error_rate}, 429s {args.rate_limit_rate}, "
+          f"malformed {args.malformed_rate}, stalls {args.stall_rate}, hedging {'on' if args.hedge else 'off'}, concurrency {args.concurrency}, batch size {args.batch_size}")
+    header = f"{'corpus':<7}{'scenario':<22}{'sent':>6}{'sent/s':>10}{'p50 s':>9}{'p99 s':>9}{'calls/sent':>12}{'peak MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        if row['scenario'] == 'split_into_sentences':
+            print(f"{row['corpus']:<7}{row['scenario']:<22}{row['sentences']:>6}{row['sentences_per_s']:>10.0f}"
+                  f"{'':>9}{'':>9}{'':>12}{row['peak_mb']:>9.2f}")
+        else:
+            print(f"{row['corpus']:<7}{row['scenario']:<22}{row['sentences']:>6}{row['sentences_per_s']:>10.2f}"
+                  f"{row['p50_s']:>9.3f}{row['p99_s']:>9.3f}{row['api_calls_per_sentence']:>12.2f}{row['peak_mb']:>9.2f}")
+
+if __name__ == '__main__':
+    sys.exit(main())
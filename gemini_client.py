@@ -0,0 +1,487 @@
+import asyncio
+import contextlib
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+import metrics
+from hedging import Hedger
+from rate_limiter import RateLimiter, is_rate_limit_error, get_retry_delay
+from scheduler import FairScheduler
+
+# How often a call is retried after a rate limit error before giving up
+MAX_RATE_LIMIT_RETRIES = int(os.environ.get('LINGUALENS_RATE_LIMIT_RETRIES', '3'))
+
+# Seconds a model call may take per stage, rate-limit waits and retries included
+STAGE_DEADLINES = {
+    'sentence': float(os.environ.get('LINGUALENS_SENTENCE_DEADLINE', '60')),
+    'batch': float(os.environ.get('LINGUALENS_BATCH_DEADLINE', '120')),
+    'romanization': float(os.environ.get('LINGUALENS_ROMANIZATION_DEADLINE', '30')),
+    'word_fallback': float(os.environ.get('LINGUALENS_WORD_FALLBACK_DEADLINE', '30')),
+    'grammar': float(os.environ.get('LINGUALENS_GRAMMAR_DEADLINE', '90')),
+}
+STAGE_DEADLINES['grammar_prefetch'] = STAGE_DEADLINES['grammar']
+
+# Clients unused for this many seconds are dropped from the registry
+CLIENT_IDLE_TIMEOUT = float(os.environ.get('LINGUALENS_CLIENT_IDLE_TIMEOUT', '600'))
+
+# A model call requested by a step generator: the pipeline stage, its prompt, the
+# language pair, optional generation settings (e.g. a JSON response schema) and
+# optionally the model to send it to instead of the caller's own
+ModelRequest = namedtuple('ModelRequest',
+                          ['stage', 'prompt', 'source_lang', 'target_lang', 'generation_config', 'model'],
+                          defaults=(None, None))
+
+# Shared by every request, so all tabs using the same API key draw from one bucket
+rate_limiter = RateLimiter(
+    rate=float(os.environ.get('LINGUALENS_RATE_LIMIT', '15')),
+    max_rate=float(os.environ.get('LINGUALENS_RATE_LIMIT_MAX', '60')),
+    idle_timeout=CLIENT_IDLE_TIMEOUT,
+    max_keys=int(os.environ.get('LINGUALENS_RATE_LIMIT_MAX_KEYS', '10000')),
+)
+
+# Shared model slots, handed out fairly between users (grammar clicks first)
+model_scheduler = FairScheduler(
+    slots=int(os.environ.get('LINGUALENS_MODEL_SLOTS', '16')),
+    interactive_weight=float(os.environ.get('LINGUALENS_INTERACTIVE_WEIGHT', '4')),
+)
+
+# Optionally repeat calls still running past a latency percentile of their stage
+hedger = Hedger(
+    enabled=os.environ.get('LINGUALENS_HEDGE', '0') == '1',
+    percentile=float(os.environ.get('LINGUALENS_HEDGE_PERCENTILE', '0.95')),
+    budget=float(os.environ.get('LINGUALENS_HEDGE_BUDGET', '0.05')),  # Hedges per call at most
+    min_delay=float(os.environ.get('LINGUALENS_HEDGE_MIN_DELAY', '0.05')),
+    max_factor=float(os.environ.get('LINGUALENS_HEDGE_MAX_FACTOR', '3')),  # Times the median latency
+)
+
+class DeadlineExceeded(TimeoutError):
+    """A model call ran past its deadline"""
+
+def deadline_for(stage):
+    """The time.monotonic() deadline for a call starting now, or None without one"""
+    seconds = STAGE_DEADLINES.get(stage)
+    return time.monotonic() + seconds if seconds else None
+
+def remaining_time(deadline):
+    """
+    Seconds left until deadline, or None without one.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded('Model call deadline exceeded')
+    return remaining
+
+def with_timeout(kwargs, timeout):
+    """generate_content arguments with the SDK's per-request timeout set"""
+    if timeout is None:
+        return kwargs
+    return dict(kwargs, request_options=dict(kwargs.get('request_options') or {}, timeout=timeout))
+
+class SDKLoader:
+    """
+    Imports the Gemini SDK on first use rather than at startup.
+
+    google.generativeai pulls in gRPC and protobuf and takes seconds to
+    import, which a freshly started worker would otherwise spend before it
+    can answer anything. preload() imports it on a background thread and
+    ready() reports when that is done, for the readiness endpoint.
+    """
+
+    def __init__(self):
+        self.genai = None
+        self.glm = None
+        self.credentials = None  # google.auth API key credentials class
+        self.import_seconds = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Import the SDK if needed and return self, with genai, glm and credentials set"""
+        if self.genai is not None:
+            return self
+        with self.lock:
+            if self.genai is None:
+                started = time.monotonic()
+                import google.ai.generativelanguage as glm
+                import google.auth.api_key
+                import google.generativeai as genai
+                self.glm = glm
+                self.credentials = google.auth.api_key.Credentials
+                self.genai = genai
+                self.import_seconds = time.monotonic() - started
+        return self
+
+    def preload(self):
+        """Start importing the SDK in the background"""
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Error importing the Gemini SDK: {e}")
+        threading.Thread(target=run, name='sdk-preload', daemon=True).start()
+
+    def ready(self):
+        return self.genai is not None
+
+    def stats(self):
+        return {
+            'loaded': int(self.ready()),
+            'import_seconds': round(self.import_seconds, 3) if self.import_seconds is not None else 0.0,
+        }
+
+sdk = SDKLoader()
+
+class GeminiClient:
+    """
+    Wraps a GenerativeModel so every generate_content call goes through the
+    rate limiter for its API key and backs off on quota errors.
+
+    The client knows its key only by hash; the key itself stays inside the
+    SDK's credentials, which are also used for the async service client.
+    """
+
+    def __init__(self, model, key_hash, limiter=None, credentials=None):
+        self.model = model
+        self.key_hash = key_hash
+        self.credentials = credentials
+        self.bucket = (limiter or rate_limiter).bucket(key_hash)
+        self.last_used = time.monotonic()
+
+    @property
+    def model_name(self):
+        return getattr(self.model, 'model_name', '')
+
+    def acquire(self, deadline=None):
+        """
+        Wait for a rate-limit token for this client's API key.
+
+        Raises:
+            DeadlineExceeded: If no token became available before the deadline
+        """
+        if not self.bucket.acquire(timeout=remaining_time(deadline)):
+            raise DeadlineExceeded('Model call deadline exceeded waiting for the rate limiter')
+
+    async def acquire_async(self, deadline=None):
+        """Async counterpart of acquire()"""
+        try:
+            await asyncio.wait_for(self.bucket.acquire_async(), remaining_time(deadline))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded('Model call deadline exceeded waiting for the rate limiter')
+
+    def generate_content(self, prompt, deadline=None, slot=None, **kwargs):
+        """
+        Call the model, waiting for rate-limit tokens and retrying quota errors.
+
+        Args:
+            deadline: time.monotonic() value by which the call, waits and
+                retries included, must be done; passed to the SDK as a timeout
+            slot: Optional callable taking a timeout and returning a context
+                manager (a model_scheduler slot) held for each API call only.
+                Waits for the rate limiter and backoff after a 429 happen
+                outside it, so a throttled key holds no slot while it sleeps.
+                The wait for the slot counts against the deadline.
+
+        Raises:
+            DeadlineExceeded: If no token became available before the deadline
+        """
+        self.last_used = time.monotonic()
+        attempt = 0
+        while True:
+            self.acquire(deadline)
+            try:
+                with slot(remaining_time(deadline)) if slot is not None else contextlib.nullcontext():
+                    response = self.model.generate_content(prompt, **with_timeout(kwargs, remaining_time(deadline)))
+            except TimeoutError:
+                raise DeadlineExceeded('Model call deadline exceeded')
+            except Exception as e:
+                attempt = self._check_retry(e, attempt)
+                continue
+            self.bucket.on_success()
+            return response
+
+    async def generate_content_async(self, prompt, deadline=None, slot=None, **kwargs):
+        """Async counterpart of generate_content()"""
+        self.last_used = time.monotonic()
+        await self._create_async_client()
+        attempt = 0
+        while True:
+            await self.acquire_async(deadline)
+            try:
+                async with slot(remaining_time(deadline)) if slot is not None else contextlib.nullcontext():
+                    timeout = remaining_time(deadline)
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, **with_timeout(kwargs, timeout)), timeout)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded('Model call deadline exceeded')
+            except Exception as e:
+                attempt = self._check_retry(e, attempt)
+                continue
+            self.bucket.on_success()
+            return response
+
+    @contextlib.contextmanager
+    def stream_content(self, prompt, deadline=None, slot=None, **kwargs):
+        """
+        Start a streamed call and hold its slot until the with block ends.
+
+        Unlike generate_content(), the slot is held while the response is
+        read. Each attempt still takes its rate-limit token before queueing
+        for the slot, and backs off after a 429 with the slot released.
+
+        Yields:
+            The streamed response
+        """
+        self.last_used = time.monotonic()
+        attempt = 0
+        while True:
+            self.acquire(deadline)
+            with slot(remaining_time(deadline)) if slot is not None else contextlib.nullcontext():
+                try:
+                    response = self.model.generate_content(
+                        prompt, stream=True, **with_timeout(kwargs, remaining_time(deadline)))
+                except Exception as e:
+                    error = e
+                else:
+                    self.bucket.on_success()
+                    yield response
+                    return
+            attempt = self._check_retry(error, attempt)
+
+    @contextlib.asynccontextmanager
+    async def stream_content_async(self, prompt, deadline=None, slot=None, **kwargs):
+        """Async counterpart of stream_content()"""
+        self.last_used = time.monotonic()
+        await self._create_async_client()
+        attempt = 0
+        while True:
+            await self.acquire_async(deadline)
+            async with slot(remaining_time(deadline)) if slot is not None else contextlib.nullcontext():
+                try:
+                    timeout = remaining_time(deadline)
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, stream=True, **with_timeout(kwargs, timeout)), timeout)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded('Model call deadline exceeded')
+                except Exception as e:
+                    error = e
+                else:
+                    self.bucket.on_success()
+                    yield response
+                    return
+            attempt = self._check_retry(error, attempt)
+
+    async def _create_async_client(self):
+        if getattr(self.model, '_async_client', False) is None:
+            # Created lazily so it binds to the event loop that uses it. The
+            # SDK import may still be running, so wait for it off the loop
+            glm = (await asyncio.to_thread(sdk.load)).glm
+            if self.model._async_client is None:
+                self.model._async_client = glm.GenerativeServiceAsyncClient(credentials=self.credentials)
+
+    def _check_retry(self, error, attempt):
+        """Re-raise error unless it is a rate limit error with retries left"""
+        if not is_rate_limit_error(error) or attempt >= MAX_RATE_LIMIT_RETRIES:
+            raise error
+        attempt += 1
+        delay = self.bucket.on_rate_limited(get_retry_delay(error))
+        print(f"Rate limited by the API, retrying in {delay:.1f}s (attempt {attempt})")
+        return attempt
+
+def call_options(request):
+    """Keyword arguments for generate_content derived from a ModelRequest"""
+    if request.generation_config is None:
+        return {}
+    return {'generation_config': request.generation_config}
+
+def client_for(model, request):
+    """The client that should answer request: model itself, or the same API key's client for request.model"""
+    # The SDK reports names as "models/<name>"
+    if request.model is None or request.model.split('/')[-1] == model.model_name.split('/')[-1]:
+        return model
+    return gemini_clients.sibling(model, request.model)
+
+def call_model(client, request, slot=None):
+    """
+    Make the call for a ModelRequest within its stage deadline, hedged if
+    that is enabled. Each call, a hedge included, holds its own slot.
+    """
+    deadline = deadline_for(request.stage)
+    return hedger.call(request.stage, lambda: client.generate_content(
+        request.prompt, deadline=deadline, slot=slot, **call_options(request)))
+
+async def call_model_async(client, request, slot=None):
+    """Async counterpart of call_model()"""
+    deadline = deadline_for(request.stage)
+    return await hedger.call_async(request.stage, lambda: client.generate_content_async(
+        request.prompt, deadline=deadline, slot=slot, **call_options(request)))
+
+def run_model_steps(steps, model, tenant=None):
+    """
+    Drive a step generator to completion, making each model call it yields.
+
+    Steps yield ModelRequest objects and receive the response text back;
+    API errors are thrown into the generator at the yield that caused them.
+    Each call waits for its API key's rate limiter and then for a fair turn
+    in model_scheduler on behalf of tenant, goes to the model the request names, if any, with model's API key, and
+    must finish within the deadline of its stage.
+
+    Returns:
+        The generator's return value
+    """
+    try:
+        request = next(steps)
+        while True:
+            started = time.monotonic()
+            try:
+                response = call_model(client_for(model, request), request,
+                                      lambda timeout, stage=request.stage: model_scheduler.slot(tenant, stage, timeout))
+                text = response.text
+            except Exception as e:
+                metrics.record_model_call(request, time.monotonic() - started, error=e)
+                request = steps.throw(e)
+            else:
+                metrics.record_model_call(request, time.monotonic() - started, response)
+                request = steps.send(text)
+    except StopIteration as stop:
+        return stop.value
+
+def advance_steps(advance, value):
+    """
+    Advance a step generator with its send or throw method.
+
+    StopIteration cannot be passed back from a worker thread, so the end of
+    the generator is returned as a flag instead.
+
+    Returns:
+        tuple: (whether the generator finished, next ModelRequest or its return value)
+    """
+    try:
+        return False, advance(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+async def run_model_steps_async(steps, model, tenant=None):
+    """
+    Async counterpart of run_model_steps using the SDK's async calls.
+
+    The steps read and write the SQLite caches and the lexicon between
+    calls, so they run on a worker thread rather than on the event loop.
+    """
+    done, request = await asyncio.to_thread(advance_steps, steps.send, None)
+    while not done:
+        started = time.monotonic()
+        try:
+            response = await call_model_async(client_for(model, request), request,
+                                              lambda timeout, stage=request.stage: model_scheduler.slot_async(tenant, stage, timeout))
+            text = response.text
+        except Exception as e:
+            metrics.record_model_call(request, time.monotonic() - started, error=e)
+            done, request = await asyncio.to_thread(advance_steps, steps.throw, e)
+        else:
+            metrics.record_model_call(request, time.monotonic() - started, response)
+            done, request = await asyncio.to_thread(advance_steps, steps.send, text)
+    return request
+
+class ClientRegistry:
+    """
+    Caches one configured GeminiClient per (API key, model name).
+
+    Each API key gets its own GenerativeServiceClient instead of going
+    through the process-global genai.configure, so concurrent requests with
+    different keys cannot pick up each other's key. Models for the same key
+    share that service client and its connection.
+
+    Clients are looked up by a hash of the key. The raw key is only handed
+    to the SDK, as API key credentials for the service client.
+    """
+
+    def __init__(self, idle_timeout=CLIENT_IDLE_TIMEOUT, limiter=None, model_factory=None):
+        self.idle_timeout = idle_timeout
+        self.limiter = limiter or rate_limiter
+        # Optional callable(model_name, key_hash) returning a model object to use
+        # instead of a real GenerativeModel, e.g. the fake backend in benchmarks/
+        self.model_factory = model_factory
+        self.services = {}  # key hash -> (GenerativeServiceClient, its credentials)
+        self.clients = {}  # (key hash, model name) -> GeminiClient
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def get(self, api_key, model_name):
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        with self.lock:
+            self._evict_idle()
+            client = self._reuse(key_hash, model_name)
+            if client is not None:
+                return client
+            if self.model_factory is None and key_hash not in self.services:
+                sdk.load()
+                credentials = sdk.credentials(api_key)
+                self.services[key_hash] = (sdk.glm.GenerativeServiceClient(credentials=credentials), credentials)
+            return self._create(key_hash, model_name)
+
+    def sibling(self, client, model_name):
+        """The client for model_name with the same API key as client"""
+        with self.lock:
+            self._evict_idle()
+            found = self._reuse(client.key_hash, model_name)
+            if found is not None:
+                return found
+            if self.model_factory is None and client.key_hash not in self.services:
+                # The key's service went idle while client was still in use
+                self.services[client.key_hash] = (client.model._client, client.credentials)
+            return self._create(client.key_hash, model_name)
+
+    def _reuse(self, key_hash, model_name):
+        client = self.clients.get((key_hash, model_name))
+        if client is not None:
+            self.reused += 1
+            client.last_used = time.monotonic()
+        return client
+
+    def _create(self, key_hash, model_name):
+        if self.model_factory is not None:
+            model = self.model_factory(model_name, key_hash)
+            credentials = None
+        else:
+            service, credentials = self.services[key_hash]
+            model = sdk.genai.GenerativeModel(model_name)
+            # GenerativeModel has no public way to pass a client, so hand it ours directly
+            model._client = service
+        client = self.clients[(key_hash, model_name)] = GeminiClient(model, key_hash, self.limiter, credentials)
+        self.created += 1
+        return client
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key, client in list(self.clients.items()):
+            if client.last_used < cutoff:
+                del self.clients[key]
+                self.evicted += 1
+        # Service clients go once no model for their key is left
+        live_keys = {key_hash for key_hash, _ in self.clients}
+        for key_hash in list(self.services):
+            if key_hash not in live_keys:
+                del self.services[key_hash]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'clients': len(self.clients),
+                'api_keys': len(self.services),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted,
+            }
+
+gemini_clients = ClientRegistry()
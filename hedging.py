@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+class Hedger:
+    """
+    Hedged model calls: when a call is still running after the given
+    percentile of recent latencies for its stage, an identical second call
+    is started and whichever succeeds first is used.
+
+    Only successful calls that were not hedged feed the latencies, and the
+    delay is capped at max_factor times their median: otherwise stalls,
+    once they are as common as 1 - percentile, set the percentile themselves
+    and hedges fire too late to help. min_delay keeps very fast stages from
+    being hedged on noise.
+
+    Hedges are limited to `budget` times the number of calls, so the extra
+    load stays bounded even when the backend is slow across the board. That
+    also bounds what hedging can fix: stalls on up to about `budget` of all
+    calls, fewer when the normal latency spread itself crosses the delay.
+    """
+
+    def __init__(self, enabled=False, percentile=0.95, budget=0.05, min_delay=0.05, max_factor=3.0,
+                 min_samples=20, window=200, workers=32):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.max_factor = max_factor
+        self.min_samples = min_samples
+        self.window = window
+        self.latencies = {}  # stage -> deque of recent unhedged call durations
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hedge') if enabled else None
+
+    def observe(self, stage, seconds):
+        """Record the duration of a successful call that was not hedged"""
+        with self.lock:
+            latencies = self.latencies.get(stage)
+            if latencies is None:
+                latencies = self.latencies[stage] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, stage):
+        """Seconds after which a call for stage is hedged, or None without enough history"""
+        with self.lock:
+            latencies = self.latencies.get(stage)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        delay = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return max(self.min_delay, min(delay, self.max_factor * ordered[len(ordered) // 2]))
+
+    def _count_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def _take_budget(self, stage):
+        with self.lock:
+            if self.fired >= self.budget * self.calls:
+                return False
+            self.fired += 1
+        metrics.hedges.inc(stage=stage, outcome='fired')
+        return True
+
+    def _record_win(self, stage):
+        with self.lock:
+            self.won += 1
+        metrics.hedges.inc(stage=stage, outcome='won')
+
+    def call(self, stage, fn):
+        """
+        Run fn(), hedging it if it is slow.
+
+        Returns:
+            The result of the first call to succeed
+
+        Raises:
+            The first call's exception if every call failed
+        """
+        if not self.enabled:
+            return fn()
+        self._count_call()
+        started = time.monotonic()
+        result, hedged = self._call(stage, fn)
+        if not hedged:
+            self.observe(stage, time.monotonic() - started)
+        return result
+
+    def _call(self, stage, fn):
+        """Returns: tuple: (result, whether a hedge was sent)"""
+        delay = self.delay(stage)
+        if delay is None:
+            return fn(), False
+
+        first = self.executor.submit(fn)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_budget(stage):
+            return first.result(), False
+
+        hedge = self.executor.submit(fn)
+        pending = {first, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._record_win(stage)
+                    # The loser keeps running until its own deadline; its result is dropped
+                    return future.result(), True
+                if error is None or future is first:
+                    error = future.exception()
+        raise error
+
+    async def call_async(self, stage, coro_fn):
+        """Async counterpart of call(); the losing call is cancelled"""
+        if not self.enabled:
+            return await coro_fn()
+        self._count_call()
+        started = time.monotonic()
+        result, hedged = await self._call_async(stage, coro_fn)
+        if not hedged:
+            self.observe(stage, time.monotonic() - started)
+        return result
+
+    async def _call_async(self, stage, coro_fn):
+        delay = self.delay(stage)
+        if delay is None:
+            return await coro_fn(), False
+
+        first = asyncio.ensure_future(coro_fn())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._take_budget(stage):
+                return await first, False
+
+            hedge = asyncio.ensure_future(coro_fn())
+            tasks.add(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._record_win(stage)
+                        return task.result(), True
+                    if error is None or task is first:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'enabled': int(self.enabled),
+                'calls': self.calls,
+                'fired': self.fired,
+                'won': self.won,
+                'fire_rate': round(self.fired / self.calls, 4) if self.calls else 0.0,
+                'win_rate': round(self.won / self.fired, 4) if self.fired else 0.0,
+            }
@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+
+class HistoryStore:
+    """
+    Per-user translation history in SQLite.
+
+    Entries are only ever appended; ids increase monotonically, so they serve
+    both as pagination cursors (older than an id) and as sync points (newer
+    than an id). Users keep at most max_entries entries, oldest dropped first.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.appended = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner TEXT NOT NULL,
+                text TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS history_owner ON history (owner, id)')
+        self.conn.commit()
+
+    def append(self, owner, text, source_lang, target_lang):
+        """Add an entry and return it"""
+        now = time.time()
+        with self.lock:
+            entry_id = self.conn.execute(
+                'INSERT INTO history (owner, text, source_lang, target_lang, created_at) VALUES (?, ?, ?, ?, ?)',
+                (owner, text, source_lang, target_lang, now)
+            ).lastrowid
+            if self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM history WHERE owner = ? AND id <= '
+                    '(SELECT id FROM history WHERE owner = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (owner, owner, self.max_entries)
+                )
+            self.conn.commit()
+            self.appended += 1
+        return entry_dict((entry_id, text, source_lang, target_lang, now))
+
+    def page(self, owner, before=None, limit=20):
+        """
+        Entries newest first, starting below the cursor.
+
+        Args:
+            before: Return only entries with a smaller id, or None for the newest
+            limit: Most entries to return
+
+        Returns:
+            tuple: (entries, cursor for the next page or None at the end)
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, text, source_lang, target_lang, created_at FROM history '
+                'WHERE owner = ? AND id < ? ORDER BY id DESC LIMIT ?',
+                (owner, before if before is not None else 2 ** 63 - 1, limit + 1)
+            ).fetchall()
+        entries = [entry_dict(row) for row in rows[:limit]]
+        return entries, (entries[-1]['id'] if len(rows) > limit else None)
+
+    def since(self, owner, after, limit=100):
+        """
+        Entries newer than a sync point, oldest first.
+
+        Returns:
+            tuple: (entries, whether more newer entries remain)
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, text, source_lang, target_lang, created_at FROM history '
+                'WHERE owner = ? AND id > ? ORDER BY id LIMIT ?',
+                (owner, after, limit + 1)
+            ).fetchall()
+        return [entry_dict(row) for row in rows[:limit]], len(rows) > limit
+
+    def stats(self):
+        with self.lock:
+            entries, owners = self.conn.execute('SELECT COUNT(*), COUNT(DISTINCT owner) FROM history').fetchone()
+        return {'entries': entries, 'users': owners, 'appended': self.appended}
+
+def entry_dict(row):
+    entry_id, text, source_lang, target_lang, created_at = row
+    return {
+        'id': entry_id,
+        'text': text,
+        'sourceLang': source_lang,
+        'targetLang': target_lang,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(created_at)),
+    }
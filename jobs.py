@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+# Job states; 'segmenting' while the text is being read, 'paused' when it needs a resume
+UNFINISHED_JOB_STATES = ('segmenting', 'queued', 'running')
+
+class JobStore:
+    """
+    Background translation jobs and their per-sentence checkpoints in SQLite.
+
+    Each sentence is stored as soon as the text is segmented and its result
+    as soon as it is processed, so a job interrupted by a crash or restart
+    picks up at the first sentence without a result. API keys are never
+    written to disk: an interrupted job waits in the 'paused' state until its
+    owner resumes it with a key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                batch_size INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                segmented INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_sentences (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                sentence TEXT NOT NULL,
+                result TEXT,
+                PRIMARY KEY (job_id, idx)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def create(self, owner, source_lang, target_lang, batch_size):
+        """Create a job in the 'segmenting' state and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO jobs (id, owner, source_lang, target_lang, batch_size, status, created_at, updated_at) '
+                "VALUES (?, ?, ?, ?, ?, 'segmenting', ?, ?)",
+                (job_id, owner, source_lang, target_lang, batch_size, now, now)
+            )
+            self.conn.commit()
+        return job_id
+
+    def add_sentences(self, job_id, start, sentences):
+        """Append segmented sentences, numbered from start"""
+        with self.lock:
+            self.conn.executemany(
+                'INSERT INTO job_sentences (job_id, idx, sentence) VALUES (?, ?, ?)',
+                ((job_id, start + i, sentence) for i, sentence in enumerate(sentences))
+            )
+            self.conn.execute(
+                'UPDATE jobs SET total = total + ?, updated_at = ? WHERE id = ?',
+                (len(sentences), time.time(), job_id)
+            )
+            self.conn.commit()
+
+    def mark_segmented(self, job_id):
+        """Record that the whole text has been read, so the job may be resumed"""
+        with self.lock:
+            self.conn.execute('UPDATE jobs SET segmented = 1, updated_at = ? WHERE id = ?', (time.time(), job_id))
+            self.conn.commit()
+
+    def set_status(self, job_id, status, error=None):
+        with self.lock:
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                (status, error, time.time(), job_id)
+            )
+            self.conn.commit()
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT id, owner, source_lang, target_lang, batch_size, status, total, done, error, segmented, '
+                'created_at, updated_at FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ('id', 'owner', 'source_lang', 'target_lang', 'batch_size', 'status', 'total', 'done', 'error',
+                'segmented', 'created_at', 'updated_at')
+        job = dict(zip(keys, row))
+        job['segmented'] = bool(job['segmented'])
+        return job
+
+    def pending(self, job_id, after, limit):
+        """Up to limit (index, sentence) pairs without a result, with index > after"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT idx, sentence FROM job_sentences WHERE job_id = ? AND idx > ? AND result IS NULL '
+                'ORDER BY idx LIMIT ?', (job_id, after, limit)
+            ).fetchall()
+
+    def save_results(self, job_id, results):
+        """Checkpoint (index, result) pairs"""
+        now = time.time()
+        with self.lock:
+            saved = 0
+            for index, result in results:
+                saved += self.conn.execute(
+                    'UPDATE job_sentences SET result = ? WHERE job_id = ? AND idx = ? AND result IS NULL',
+                    (json.dumps(result, ensure_ascii=False), job_id, index)
+                ).rowcount
+            self.conn.execute('UPDATE jobs SET done = done + ?, updated_at = ? WHERE id = ?', (saved, now, job_id))
+            self.conn.commit()
+
+    def results(self, job_id, offset, limit):
+        """
+        One page of a job's sentences in order.
+
+        Returns:
+            list: (index, result) pairs, with None as the result of
+            sentences that are not processed yet
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT idx, result FROM job_sentences WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?',
+                (job_id, offset, limit)
+            ).fetchall()
+        return [(index, json.loads(result) if result is not None else None) for index, result in rows]
+
+    def pause_unfinished(self):
+        """
+        Called at startup: jobs that were queued or running when the process
+        stopped wait for a resume, and half-read uploads are marked failed.
+        Those are never marked segmented, so they cannot be resumed either.
+        """
+        with self.lock:
+            paused = self.conn.execute(
+                "UPDATE jobs SET status = 'paused', error = ? WHERE status IN ('queued', 'running')",
+                ('Interrupted by a restart; resume the job with your API key',)
+            ).rowcount
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ? WHERE status = 'segmenting'",
+                ('Interrupted while reading the text',)
+            )
+            self.conn.commit()
+        return paused
+
+    def delete(self, job_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM job_sentences WHERE job_id = ?', (job_id,))
+            self.conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            pending = self.conn.execute(
+                f"SELECT COALESCE(SUM(total - done), 0) FROM jobs WHERE status IN ({', '.join('?' * len(UNFINISHED_JOB_STATES))})",
+                UNFINISHED_JOB_STATES
+            ).fetchone()[0]
+        return {
+            'jobs': sum(counts.values()),
+            'running': counts.get('running', 0),
+            'queued': counts.get('queued', 0),
+            'paused': counts.get('paused', 0),
+            'done': counts.get('done', 0),
+            'pending_sentences': pending,
+        }
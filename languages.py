@@ -0,0 +1,286 @@
+"""
+Language registry: display names and script detection on sentence text.
+
+Everything here is built once at import; lookups happen several times per
+sentence while prompts are built.
+"""
+import re
+
+# Display names used in prompts, by ISO 639-1/639-2 code or Google Translate-style tag
+LANGUAGE_NAMES = {
+    'ab': 'Abkhaz',
+    'ace': 'Acehnese',
+    'ach': 'Acholi',
+    'aa': 'Afar',
+    'af': 'Afrikaans',
+    'sq': 'Albanian',
+    'alr': 'Alur',
+    'am': 'Amharic',
+    'ar': 'Arabic',
+    'hy': 'Armenian',
+    'as': 'Assamese',
+    'av': 'Avar',
+    'awa': 'Awadhi',
+    'ay': 'Aymara',
+    'az': 'Azerbaijani',
+    'ban': 'Balinese',
+    'bal': 'Baluchi',
+    'bm': 'Bambara',
+    'bci': 'Baoulé',
+    'ba': 'Bashkir',
+    'eu': 'Basque',
+    'btk': 'Batak Karo',
+    'bts': 'Batak Simalungun',
+    'tbw': 'Batak Toba',
+    'be': 'Belarusian',
+    'bem': 'Bemba',
+    'bn': 'Bengali',
+    'bew': 'Betawi',
+    'bho': 'Bhojpuri',
+    'bik': 'Bikol',
+    'bs': 'Bosnian',
+    'br': 'Breton',
+    'bg': 'Bulgarian',
+    'bua': 'Buryat',
+    'yue': 'Cantonese',
+    'ca': 'Catalan',
+    'ceb': 'Cebuano',
+    'ch': 'Chamorro',
+    'ce': 'Chechen',
+    'ny': 'Chichewa',
+    'zh-Hans': 'Chinese (Simplified)',
+    'zh-Hant': 'Chinese (Traditional)',
+    'chk': 'Chuukese',
+    'cv': 'Chuvash',
+    'co': 'Corsican',
+    'crh': 'Crimean Tatar (Cyrillic)',
+    'crh-Latn': 'Crimean Tatar (Latin)',
+    'hr': 'Croatian',
+    'cs': 'Czech',
+    'da': 'Danish',
+    'prs': 'Dari',
+    'dv': 'Dhivehi',
+    'din': 'Dinka',
+    'doi': 'Dogri',
+    'dug': 'Dombe',
+    'nl': 'Dutch',
+    'dyu': 'Dyula',
+    'dz': 'Dzongkha',
+    'en': 'English',
+    'eo': 'Esperanto',
+    'et': 'Estonian',
+    'ee': 'Ewe',
+    'fo': 'Faroese',
+    'fj': 'Fijian',
+    'fil': 'Filipino',
+    'fi': 'Finnish',
+    'fon': 'Fon',
+    'fr': 'French',
+    'fr-CA': 'French (Canada)',
+    'fy': 'Frisian',
+    'fur': 'Friulian',
+    'ff': 'Fulani',
+    'gaa': 'Ga',
+    'gl': 'Galician',
+    'ka': 'Georgian',
+    'de': 'German',
+    'el': 'Greek',
+    'gn': 'Guarani',
+    'gu': 'Gujarati',
+    'ht': 'Haitian Creole',
+    'hak': 'Hakha Chin',
+    'ha': 'Hausa',
+    'haw': 'Hawaiian',
+    'he': 'Hebrew',
+    'hil': 'Hiligaynon',
+    'hi': 'Hindi',
+    'hmn': 'Hmong',
+    'hu': 'Hungarian',
+    'hrx': 'Hunsrik',
+    'iba': 'Iban',
+    'is': 'Icelandic',
+    'ig': 'Igbo',
+    'ilo': 'Ilocano',
+    'id': 'Indonesian',
+    'iu': 'Inuktut (Latin)',
+    'iu-Syll': 'Inuktut (Syllabics)',
+    'ga': 'Irish',
+    'it': 'Italian',
+    'jam': 'Jamaican Patois',
+    'ja': 'Japanese',
+    'jv': 'Javanese',
+    'kac': 'Jingpo',
+    'kl': 'Kalaallisut',
+    'kn': 'Kannada',
+    'kr': 'Kanuri',
+    'pam': 'Kapampangan',
+    'kk': 'Kazakh',
+    'kha': 'Khasi',
+    'km': 'Khmer',
+    'ki': 'Kiga',
+    'kg': 'Kikongo',
+    'rw': 'Kinyarwanda',
+    'ktu': 'Kituba',
+    'trp': 'Kokborok',
+    'kv': 'Komi',
+    'kok': 'Konkani',
+    'ko': 'Korean',
+    'kri': 'Krio',
+    'ku': 'Kurdish (Kurmanji)',
+    'ckb': 'Kurdish (Sorani)',
+    'ky': 'Kyrgyz',
+    'lo': 'Lao',
+    'ltg': 'Latgalian',
+    'la': 'Latin',
+    'lv': 'Latvian',
+    'lij': 'Ligurian',
+    'li': 'Limburgish',
+    'ln': 'Lingala',
+    'lt': 'Lithuanian',
+    'lmo': 'Lombard',
+    'lg': 'Luganda',
+    'luo': 'Luo',
+    'lb': 'Luxembourgish',
+    'mk': 'Macedonian',
+    'mad': 'Madurese',
+    'mai': 'Maithili',
+    'mak': 'Makassar',
+    'mg': 'Malagasy',
+    'ms': 'Malay',
+    'ms-Arab': 'Malay (Jawi)',
+    'ml': 'Malayalam',
+    'mt': 'Maltese',
+    'mam': 'Mam',
+    'gv': 'Manx',
+    'mi': 'Maori',
+    'mr': 'Marathi',
+    'mh': 'Marshallese',
+    'mfe': 'Mauritian Creole',
+    'mhr': 'Meadow Mari',
+    'mni': 'Meiteilon (Manipuri)',
+    'min': 'Minang',
+    'lus': 'Mizo',
+    'mn': 'Mongolian',
+    'my': 'Myanmar (Burmese)',
+    'nah': 'Nahuatl (Eastern Huasteca)',
+    'ndc': 'Ndau',
+    'nr': 'Ndebele (South)',
+    'new': 'Nepalbhasa (Newari)',
+    'ne': 'Nepali',
+    'nqo': 'NKo',
+    'no': 'Norwegian (Bokmål)',
+    'nus': 'Nuer',
+    'oc': 'Occitan',
+    'or': 'Odia (Oriya)',
+    'om': 'Oromo',
+    'os': 'Ossetian',
+    'pag': 'Pangasinan',
+    'pap': 'Papiamento',
+    'ps': 'Pashto',
+    'fa': 'Persian',
+    'pl': 'Polish',
+    'pt-BR': 'Portuguese (Brazil)',
+    'pt-PT': 'Portuguese (Portugal)',
+    'pa': 'Punjabi (Gurmukhi)',
+    'pa-Arab': 'Punjabi (Shahmukhi)',
+    'qu': 'Quechua',
+    'kek': 'Qʼeqchiʼ',
+    'rom': 'Romani',
+    'ro': 'Romanian',
+    'rn': 'Rundi',
+    'ru': 'Russian',
+    'se': 'Sami (North)',
+    'sm': 'Samoan',
+    'sg': 'Sango',
+    'sa': 'Sanskrit',
+    'sat': 'Santali (Latin)',
+    'sat-Olck': 'Santali (Ol Chiki)',
+    'gd': 'Scots Gaelic',
+    'nso': 'Sepedi',
+    'sr': 'Serbian',
+    'st': 'Sesotho',
+    'crs': 'Seychellois Creole',
+    'shn': 'Shan',
+    'sn': 'Shona',
+    'scn': 'Sicilian',
+    'szl': 'Silesian',
+    'sd': 'Sindhi',
+    'si': 'Sinhala',
+    'sk': 'Slovak',
+    'sl': 'Slovenian',
+    'so': 'Somali',
+    'es': 'Spanish',
+    'su': 'Sundanese',
+    'sus': 'Susu',
+    'sw': 'Swahili',
+    'ss': 'Swati',
+    'sv': 'Swedish',
+    'ty': 'Tahitian',
+    'tg': 'Tajik',
+    'ber': 'Tamazight',
+    'ber-Tfng': 'Tamazight (Tifinagh)',
+    'ta': 'Tamil',
+    'tt': 'Tatar',
+    'te': 'Telugu',
+    'tet': 'Tetum',
+    'th': 'Thai',
+    'bo': 'Tibetan',
+    'ti': 'Tigrinya',
+    'tiv': 'Tiv',
+    'tpi': 'Tok Pisin',
+    'to': 'Tongan',
+    'lua': 'Tshiluba',
+    'ts': 'Tsonga',
+    'tn': 'Tswana',
+    'tcy': 'Tulu',
+    'tum': 'Tumbuka',
+    'tr': 'Turkish',
+    'tk': 'Turkmen',
+    'tyv': 'Tuvan',
+    'tw': 'Twi',
+    'udm': 'Udmurt',
+    'uk': 'Ukrainian',
+    'ur': 'Urdu',
+    'ug': 'Uyghur',
+    'uz': 'Uzbek',
+    've': 'Venda',
+    'vec': 'Venetian',
+    'vi': 'Vietnamese',
+    'war': 'Waray',
+    'cy': 'Welsh',
+    'wo': 'Wolof',
+    'xh': 'Xhosa',
+    'sah': 'Yakut',
+    'yi': 'Yiddish',
+    'yo': 'Yoruba',
+    'yua': 'Yucatec Maya',
+    'zap': 'Zapotec',
+    'zu': 'Zulu',
+}
+
+# Characters outside the Latin script blocks (Basic Latin through Latin
+# Extended-B, IPA, combining marks, Latin Extended Additional/C/D/E,
+# ligatures and fullwidth ASCII). Only the fullwidth ASCII part of the
+# Halfwidth and Fullwidth Forms block is Latin; halfwidth katakana and
+# Hangul there are not. Only letters among them count, so punctuation,
+# digits and symbols from other blocks never do.
+NON_LATIN_CHARACTER = re.compile(
+    '[^\u0000-\u036f\u1d00-\u1dff\u1e00-\u1eff\u2000-\u2bff\u2c60-\u2c7f'
+    '\u2e00-\u2e7f\ua720-\ua7ff\uab30-\uab6f\ufb00-\ufb06\ufe00-\ufe0f\uff01-\uff5e]'
+)
+
+def get_language_name(code):
+    """The display name for a language code, or the code itself if unknown"""
+    return LANGUAGE_NAMES.get(code, code)
+
+def has_non_latin_letters(text):
+    """
+    Whether text contains letters of a script other than Latin.
+
+    This decides per sentence whether a romanization is needed: a Serbian
+    sentence in Latin letters or a line of digits in a Russian text needs
+    none, while a Cyrillic quote inside a French text does.
+    """
+    if text.isascii():
+        return False
+    return any(char.isalpha() for char in NON_LATIN_CHARACTER.findall(text))
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+
+# How often (in add calls) the lexicon is evicted down to max_entries
+PRUNE_INTERVAL = 100
+
+class Lexicon:
+    """
+    Word translations learned from model results, per language pair.
+
+    Every translation seen for a word is stored with a frequency count, and
+    lookups return the most frequent one once it has been seen min_count
+    times. Rows are keyed by (pair, word, translation) in a WITHOUT ROWID
+    table, so each entry costs little more than its text. Beyond max_entries
+    rows the least frequent, least recently seen translations are evicted.
+    """
+
+    def __init__(self, path, min_count=2, max_entries=200000):
+        self.path = path
+        self.min_count = min_count
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.adds = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS lexicon (
+                pair TEXT NOT NULL,
+                word TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 1,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (pair, word, translation)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS lexicon_eviction ON lexicon (count, seen_at)')
+        self.conn.commit()
+
+    @staticmethod
+    def pair(source_lang, target_lang):
+        return f'{source_lang}:{target_lang}'
+
+    def add(self, source_lang, target_lang, word_translations):
+        """
+        Record the translations from one result.
+
+        Only translations the model produced belong here; feeding back ones
+        that came from lookup() would let any entry confirm itself.
+
+        Args:
+            source_lang: Source language code
+            target_lang: Target language code
+            word_translations: Dict mapping cleaned source words to translations
+        """
+        pair = self.pair(source_lang, target_lang)
+        now = time.time()
+        rows = [(pair, word.lower(), str(translation).strip(), now)
+                for word, translation in word_translations.items()
+                if word and str(translation).strip()]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("""
+                INSERT INTO lexicon (pair, word, translation, seen_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (pair, word, translation) DO UPDATE SET count = count + 1, seen_at = excluded.seen_at
+            """, rows)
+            self.conn.commit()
+            self.adds += 1
+            if self.adds % PRUNE_INTERVAL == 0:
+                self._prune()
+
+    def prune(self):
+        """Evict down to max_entries"""
+        with self.lock:
+            self._prune()
+
+    def _prune(self):
+        if not self.max_entries:
+            return
+        count = self.conn.execute('SELECT COUNT(*) FROM lexicon').fetchone()[0]
+        if count > self.max_entries:
+            self.evictions += self.conn.execute(
+                'DELETE FROM lexicon WHERE (pair, word, translation) IN '
+                '(SELECT pair, word, translation FROM lexicon ORDER BY count, seen_at LIMIT ?)',
+                (count - self.max_entries,)
+            ).rowcount
+            self.conn.commit()
+
+    def lookup(self, source_lang, target_lang, words):
+        """
+        Find known translations for words.
+
+        Returns:
+            dict: The most frequent translation of each word that has one
+        """
+        if not words:
+            return {}
+        pair = self.pair(source_lang, target_lang)
+        keys = {word.lower() for word in words}
+        placeholders = ','.join('?' * len(keys))
+        with self.lock:
+            rows = self.conn.execute(f"""
+                SELECT word, translation, count FROM lexicon
+                WHERE pair = ? AND word IN ({placeholders}) AND count >= ?
+                ORDER BY count
+            """, (pair, *keys, self.min_count)).fetchall()
+            # Rows come in ascending count order, so the most frequent translation wins
+            best = {word: translation for word, translation, _ in rows}
+            found = {word: best[word.lower()] for word in words if word.lower() in best}
+            self.hits += len(found)
+            self.misses += len(words) - len(found)
+        return found
+
+    def clear(self):
+        """Forget every learned translation and reset the counters"""
+        with self.lock:
+            self.conn.execute('DELETE FROM lexicon')
+            self.conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM lexicon').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
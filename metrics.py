@@ -0,0 +1,181 @@
+import bisect
+import threading
+
+from languages import LANGUAGE_NAMES
+
+# Default histogram buckets for latencies, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Labels whose values come from the request; anything outside the language
+# registry is reported as 'other', so clients cannot create new series at will
+LANGUAGE_LABELS = ('source_lang', 'target_lang')
+
+def language_label(code):
+    """A language code as a label value, or 'other' if it is not a known language"""
+    return code if isinstance(code, str) and code in LANGUAGE_NAMES else 'other'
+
+def label_key(names, labels):
+    """Label values in the order of names, with language codes checked"""
+    return tuple(language_label(labels.get(name)) if name in LANGUAGE_LABELS else labels.get(name, '')
+                 for name in names)
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = label_key(self.labels, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, format_labels(self.labels, key), value) for key, value in sorted(self.values.items())]
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = label_key(self.labels, labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, entry in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', format_labels(self.labels, key, [('le', bound)]), cumulative))
+                samples.append((f'{self.name}_bucket', format_labels(self.labels, key, [('le', '+Inf')]), entry[-1]))
+                samples.append((f'{self.name}_sum', format_labels(self.labels, key), entry[-2]))
+                samples.append((f'{self.name}_count', format_labels(self.labels, key), entry[-1]))
+        return samples
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, gauges=None):
+        """
+        Render all metrics.
+
+        Args:
+            gauges: Optional nested dict of {subsystem: {name: number}} to
+                export as lingualens_<subsystem>_<name> gauges
+
+        Returns:
+            str: Metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        for subsystem, values in (gauges or {}).items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric_name = f'lingualens_{subsystem}_{name}'
+                    lines.append(f'# TYPE {metric_name} gauge')
+                    lines.append(f'{metric_name} {value}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+model_call_seconds = registry.histogram(
+    'lingualens_model_call_seconds', 'Latency of Gemini calls by pipeline stage and model',
+    ['stage', 'model', 'source_lang', 'target_lang'])
+model_calls = registry.counter(
+    'lingualens_model_calls_total', 'Gemini calls by pipeline stage, model and outcome',
+    ['stage', 'model', 'source_lang', 'target_lang', 'outcome'])
+model_tokens = registry.counter(
+    'lingualens_model_tokens_total', 'Tokens reported by the Gemini API',
+    ['stage', 'source_lang', 'target_lang', 'kind'])
+sentence_seconds = registry.histogram(
+    'lingualens_sentence_seconds', 'Time to produce one sentence result, cache hits included',
+    ['source_lang', 'target_lang'])
+json_parses = registry.counter(
+    'lingualens_json_parse_total', 'Parses of model JSON responses by outcome',
+    ['stage', 'source_lang', 'target_lang', 'outcome'])
+romanizations = registry.counter(
+    'lingualens_romanizations_total', 'Sentences romanized, by local tables or by the model',
+    ['source', 'source_lang'])
+scheduler_wait_seconds = registry.histogram(
+    'lingualens_scheduler_wait_seconds', 'Time model calls waited in the fair scheduler queue',
+    ['priority'])
+json_retries = registry.counter(
+    'lingualens_json_retries_total', 'Sentence requests repeated because the response was unusable',
+    ['stage', 'source_lang', 'target_lang'])
+escalations = registry.counter(
+    'lingualens_escalations_total', 'Answers from the fast model that failed validation and went to the stage model',
+    ['stage', 'source_lang', 'target_lang'])
+hedges = registry.counter(
+    'lingualens_hedges_total', 'Duplicate model calls started for slow calls, and how many answered first',
+    ['stage', 'outcome'])
+fallback_words = registry.histogram(
+    'lingualens_fallback_words', 'Words per sentence sent to the fallback translation request',
+    ['source_lang', 'target_lang'], buckets=(0, 1, 2, 3, 5, 10, 20, 50))
+
+def record_model_call(request, seconds, response=None, error=None):
+    """Record latency, outcome and token usage of one model call"""
+    labels = dict(stage=request.stage, source_lang=request.source_lang, target_lang=request.target_lang)
+    model_call_seconds.observe(seconds, model=request.model or 'default', **labels)
+    model_calls.inc(outcome=call_outcome(error), model=request.model or 'default', **labels)
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        model_tokens.inc(getattr(usage, 'prompt_token_count', 0) or 0, kind='prompt', **labels)
+        model_tokens.inc(getattr(usage, 'candidates_token_count', 0) or 0, kind='completion', **labels)
+
+def call_outcome(error):
+    """'ok', 'timeout' for a missed deadline (ours or the API's 504), or 'error'"""
+    if error is None:
+        return 'ok'
+    if isinstance(error, TimeoutError) or getattr(error, 'code', None) == 504:
+        return 'timeout'
+    return 'error'
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import threading
+
+class PaidEmailFile:
+    """
+    Paid email list backed by a text file with one address per line.
+
+    The file is loaded once into a set and reloaded only when its
+    modification time or size changes, so a lookup is a stat and a set check.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.emails = set()
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return
+        with self.lock:
+            if signature == self.signature:
+                return
+            with open(self.path, 'r') as f:
+                emails = {line.strip().lower() for line in f if line.strip()}
+            self.emails = emails
+            self.signature = signature
+            print(f"Loaded {len(emails)} paid emails from {self.path}")
+
+    def contains(self, email):
+        self._reload_if_changed()
+        return email.lower() in self.emails
+
+    def count(self):
+        self._reload_if_changed()
+        return len(self.emails)
+
+class PaidEmailDatabase:
+    """Paid email list stored in SQLite, for lists too large to keep in memory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS paid_emails (email TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.conn.commit()
+
+    def contains(self, email):
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM paid_emails WHERE email = ?', (email.lower(),)).fetchone()
+        return row is not None
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM paid_emails').fetchone()[0]
+
+    def import_file(self, path, batch_size=10000):
+        """
+        Bulk-import addresses from a text file with one address per line.
+
+        Returns:
+            int: Number of addresses that were not already in the database
+        """
+        before = self.count()
+        with open(path, 'r') as f, self.lock:
+            batch = []
+            for line in f:
+                email = line.strip().lower()
+                if email:
+                    batch.append((email,))
+                if len(batch) >= batch_size:
+                    self.conn.executemany('INSERT OR IGNORE INTO paid_emails (email) VALUES (?)', batch)
+                    batch = []
+            if batch:
+                self.conn.executemany('INSERT OR IGNORE INTO paid_emails (email) VALUES (?)', batch)
+            self.conn.commit()
+        return self.count() - before
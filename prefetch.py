@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+class Prefetcher:
+    """
+    Runs speculative work in the background within a per-key budget.
+
+    Each API key may start at most `budget` prefetches per `window` seconds,
+    and at most `max_pending` prefetches wait at once; offers beyond either
+    limit are dropped rather than queued. The keys of finished prefetches are
+    remembered so later requests can be counted as hits or misses.
+    """
+
+    def __init__(self, budget=60, window=3600, workers=2, max_pending=32, remembered=10000):
+        self.budget = budget
+        self.window = window
+        self.max_pending = max_pending
+        self.remembered = remembered
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self.spent = {}  # key hash -> deque of start times within the window
+        self.pending = set()  # result keys queued or running
+        self.done = OrderedDict()  # result keys prefetched and not requested yet
+        self.counts = {'started': 0, 'completed': 0, 'failed': 0, 'no_headroom': 0, 'over_budget': 0,
+                       'busy': 0, 'requests': 0, 'hits': 0}
+        self.lock = threading.Lock()
+
+    def offer(self, api_key, result_key, fn, headroom=True):
+        """
+        Start fn() in the background unless the budget or queue is exhausted.
+
+        Args:
+            api_key: The key whose budget the prefetch is charged to
+            result_key: Identifies the result fn produces, for hit tracking
+            fn: Callable doing the work
+            headroom: False when the backend has no capacity to spare, which
+                drops the offer
+
+        Returns:
+            bool: True if the prefetch was started
+        """
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        now = time.monotonic()
+        with self.lock:
+            if result_key in self.pending or result_key in self.done:
+                return False
+            if not headroom:
+                self.counts['no_headroom'] += 1
+                return False
+            if len(self.pending) >= self.max_pending:
+                self.counts['busy'] += 1
+                return False
+            spent = self.spent.setdefault(key_hash, deque())
+            while spent and spent[0] <= now - self.window:
+                spent.popleft()
+            if len(spent) >= self.budget:
+                self.counts['over_budget'] += 1
+                return False
+            spent.append(now)
+            self.pending.add(result_key)
+            self.counts['started'] += 1
+            # Keys idle for a whole window have nothing left to count
+            if len(self.spent) > 1024:
+                self.spent = {k: times for k, times in self.spent.items() if times and times[-1] > now - self.window}
+        self.executor.submit(self._run, result_key, fn)
+        return True
+
+    def _run(self, result_key, fn):
+        try:
+            fn()
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            with self.lock:
+                self.pending.discard(result_key)
+                self.counts['failed'] += 1
+            return
+        with self.lock:
+            self.pending.discard(result_key)
+            self.counts['completed'] += 1
+            self.done[result_key] = True
+            while len(self.done) > self.remembered:
+                self.done.popitem(last=False)
+
+    def record_request(self, result_key):
+        """Count a real request for a result, as a hit if it was prefetched"""
+        with self.lock:
+            self.counts['requests'] += 1
+            if self.done.pop(result_key, None):
+                self.counts['hits'] += 1
+                return True
+            return False
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+            counts['pending'] = len(self.pending)
+        # Share of requests served by a prefetch, and share of prefetches that got used
+        counts['hit_rate'] = round(counts['hits'] / counts['requests'], 4) if counts['requests'] else 0.0
+        counts['used_rate'] = round(counts['hits'] / counts['completed'], 4) if counts['completed'] else 0.0
+        return counts
@@ -0,0 +1,203 @@
+import asyncio
+import re
+import threading
+import time
+
+# Requests per minute each API key starts with, and the most it may grow to
+DEFAULT_RATE = 15
+MAX_RATE = 60
+MIN_RATE = 2
+BURST = 4
+
+# Backoff used when a quota error carries no retry hint
+DEFAULT_BACKOFF = 10
+MAX_BACKOFF = 120
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to the quota the API actually grants.
+
+    The rate grows a little after every successful call and is halved whenever
+    the API reports a rate limit, so it settles just below the real limit.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, max_rate=MAX_RATE, min_rate=MIN_RATE, burst=BURST):
+        self.rate = rate / 60.0  # Tokens per second
+        self.max_rate = max_rate / 60.0
+        self.min_rate = min_rate / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.last_used = self.updated
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one may be
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.last_used = now
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+
+    def acquire(self, timeout=None):
+        """
+        Block until a token is available.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if a token was taken, False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_for = self.try_acquire()
+            if not wait_for:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_for = min(wait_for, remaining)
+            time.sleep(wait_for)
+
+    async def acquire_async(self):
+        """Wait for a token without blocking the event loop"""
+        while True:
+            wait_for = self.try_acquire()
+            if not wait_for:
+                return
+            await asyncio.sleep(wait_for)
+
+    def available(self):
+        """Tokens that could be taken right now, without taking any"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            return 0.0 if now < self.blocked_until else self.tokens
+
+    def on_success(self):
+        """Additively raise the rate after a call went through"""
+        with self.lock:
+            self.failures = 0
+            self.rate = min(self.max_rate, self.rate + 1 / 60.0)
+
+    def on_rate_limited(self, retry_after=None):
+        """
+        Back off after a 429 or quota error.
+
+        Args:
+            retry_after: Seconds the API asked us to wait, if it said so
+
+        Returns:
+            float: Seconds until the next call is allowed
+        """
+        with self.lock:
+            self.failures += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after is None:
+                retry_after = min(MAX_BACKOFF, DEFAULT_BACKOFF * 2 ** (self.failures - 1))
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.tokens = 0
+            self.updated = now
+            return self.blocked_until - now
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rate_per_minute': round(self.rate * 60, 2),
+                'tokens': round(self.tokens, 2),
+                'blocked_for': round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            }
+
+class RateLimiter:
+    """
+    Registry of token buckets, one per API key.
+
+    Like idle clients in the client registry, buckets not used for
+    idle_timeout seconds are dropped, unless they are still backing off.
+    At most max_keys are kept, so requests with made-up keys cannot grow
+    the registry without bound; past that the least recently used goes.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, max_rate=MAX_RATE, min_rate=MIN_RATE, burst=BURST,
+                 idle_timeout=600, max_keys=10000):
+        self.settings = dict(rate=rate, max_rate=max_rate, min_rate=min_rate, burst=burst)
+        self.idle_timeout = idle_timeout
+        self.max_keys = max_keys
+        self.buckets = {}  # key hash -> TokenBucket
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def bucket(self, key):
+        """The bucket for an API key, given as its hash so raw keys are never kept here"""
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self._evict()
+                bucket = self.buckets[key] = TokenBucket(**self.settings)
+            return bucket
+
+    def _evict(self):
+        """Drop idle buckets, then the least recently used ones to make room for one more"""
+        now = time.monotonic()
+        cutoff = now - self.idle_timeout
+        for key, bucket in list(self.buckets.items()):
+            if bucket.last_used < cutoff and bucket.blocked_until <= now:
+                del self.buckets[key]
+                self.evicted += 1
+        while len(self.buckets) >= self.max_keys:
+            # Keys that are backing off go last, so their backoff is not forgotten
+            oldest = min(self.buckets, key=lambda key: (self.buckets[key].blocked_until > now,
+                                                        self.buckets[key].last_used))
+            del self.buckets[oldest]
+            self.evicted += 1
+
+    def stats(self):
+        with self.lock:
+            return {'keys': len(self.buckets), 'evicted': self.evicted}
+
+def is_rate_limit_error(error):
+    """Check whether an exception from the Gemini API is a 429 / quota error"""
+    if getattr(error, 'code', None) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'resource exhausted' in message or 'rate limit' in message
+
+def get_retry_delay(error):
+    """
+    Extract the retry hint from a rate limit error, if there is one.
+
+    Gemini reports it either as a RetryInfo detail ("retry_delay { seconds: 37 }")
+    or in the message text ("Please retry in 37.5s").
+
+    Returns:
+        float or None: Seconds to wait before retrying
+    """
+    for detail in getattr(error, 'details', None) or []:
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None and hasattr(retry_delay, 'seconds'):
+            return retry_delay.seconds + getattr(retry_delay, 'nanos', 0) / 1e9
+
+    message = str(error)
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', message)
+    if not match:
+        match = re.search(r'retry in\s*([\d.]+)\s*s', message, re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# How often (in writes) expired and least recently used entries are pruned
+PRUNE_INTERVAL = 100
+
+# Last-access times are only rewritten when older than this, so hits stay read-only
+TOUCH_INTERVAL = 3600
+
+def normalize_sentence(sentence):
+    """Normalize a sentence so trivially different copies share a cache entry"""
+    return ' '.join(unicodedata.normalize('NFC', sentence).split())
+
+def make_key(*parts):
+    """Build a fixed-size cache key from its parts"""
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+class ResultCache:
+    """
+    Disk-backed JSON cache stored in a SQLite table.
+
+    Entries expire after max_age seconds, and once the table holds more than
+    max_entries rows the least recently used ones are evicted.
+    """
+
+    def __init__(self, path, table='results', max_entries=50000, max_age=30 * 24 * 3600):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                f'SELECT value, created_at, accessed_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (self.max_age and now - row[1] > self.max_age):
+                if row is not None:
+                    self.conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                    self.conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            if now - row[2] > TOUCH_INTERVAL:
+                self.conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+                self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def contains(self, key):
+        """Check for a live entry without counting a hit or miss"""
+        with self.lock:
+            row = self.conn.execute(f'SELECT created_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        return row is not None and not (self.max_age and time.time() - row[0] > self.max_age)
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key"""
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self.lock:
+            self.conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, data, now, now)
+            )
+            self.conn.commit()
+            self.writes += 1
+            if self.writes % PRUNE_INTERVAL == 0:
+                self._prune(now)
+
+    def prune(self):
+        """Drop expired entries and evict down to max_entries"""
+        with self.lock:
+            self._prune(time.time())
+
+    def _prune(self, now):
+        removed = 0
+        if self.max_age:
+            removed += self.conn.execute(
+                f'DELETE FROM {self.table} WHERE created_at < ?', (now - self.max_age,)
+            ).rowcount
+        count = self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        if self.max_entries and count > self.max_entries:
+            removed += self.conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            ).rowcount
+        self.conn.commit()
+        self.evictions += removed
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self.lock:
+            self.conn.execute(f'DELETE FROM {self.table}')
+            self.conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            size = self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
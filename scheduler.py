@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+import metrics
+
+# Stages answered while a user waits on a click; everything else is bulk work
+INTERACTIVE_STAGES = {'grammar'}
+# Speculative work nobody is waiting for yet
+BACKGROUND_STAGES = {'grammar_prefetch'}
+
+class Ticket:
+    """One queued request for a model slot"""
+
+    def __init__(self, flow, priority, grant):
+        self.flow = flow
+        self.priority = priority
+        self.grant = grant  # Called under the scheduler lock once the slot is ours
+        self.granted = False
+        self.cancelled = False
+        self.enqueued = time.monotonic()
+
+class FairScheduler:
+    """
+    Weighted fair queuing of model calls across users.
+
+    At most `slots` calls run at once. Waiting calls are ordered by start-time
+    fair queuing over flows, one flow per (tenant, priority class): a tenant
+    that has sent many requests has its tags pushed far ahead, so a newcomer's
+    first request goes before the backlog. Interactive requests get a larger
+    weight, so their tags advance more slowly than bulk ones; background
+    requests get a smaller one.
+    """
+
+    def __init__(self, slots=16, interactive_weight=4.0, background_weight=0.25):
+        self.slots = slots
+        self.weights = {'interactive': interactive_weight, 'bulk': 1.0, 'background': background_weight}
+        self.active = 0
+        self.queue = []  # heap of (start tag, sequence, ticket)
+        self.finish = {}  # flow -> finish tag of its last queued request
+        self.virtual_time = 0.0
+        self.sequence = itertools.count()
+        self.granted = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def priority(stage):
+        if stage in INTERACTIVE_STAGES:
+            return 'interactive'
+        if stage in BACKGROUND_STAGES:
+            return 'background'
+        return 'bulk'
+
+    def _enqueue(self, tenant, stage, grant):
+        priority = self.priority(stage)
+        ticket = Ticket((tenant, priority), priority, grant)
+        start = max(self.virtual_time, self.finish.get(ticket.flow, 0.0))
+        self.finish[ticket.flow] = start + 1.0 / self.weights[priority]
+        heapq.heappush(self.queue, (start, next(self.sequence), ticket))
+        self._dispatch()
+        return ticket
+
+    def _dispatch(self):
+        while self.active < self.slots and self.queue:
+            start, _, ticket = heapq.heappop(self.queue)
+            if ticket.cancelled:
+                continue
+            self.virtual_time = max(self.virtual_time, start)
+            self.active += 1
+            ticket.granted = True
+            wait = time.monotonic() - ticket.enqueued
+            self.granted += 1
+            self.waited += wait
+            self.max_wait = max(self.max_wait, wait)
+            metrics.scheduler_wait_seconds.observe(wait, priority=ticket.priority)
+            ticket.grant()
+        # Flows that have caught up with virtual time carry no state worth keeping
+        if len(self.finish) > 1024:
+            self.finish = {flow: tag for flow, tag in self.finish.items() if tag > self.virtual_time}
+
+    def _release(self):
+        with self.lock:
+            self.active -= 1
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, tenant, stage, timeout=None):
+        """
+        Hold a model slot for the duration of the block, waiting for a fair turn.
+
+        Raises:
+            TimeoutError: If no slot was granted within timeout seconds
+        """
+        event = threading.Event()
+        with self.lock:
+            ticket = self._enqueue(tenant, stage, event.set)
+        if not event.wait(timeout):
+            with self.lock:
+                ticket.cancelled = True
+                granted = ticket.granted
+            if not granted:
+                raise TimeoutError('No model slot became free before the deadline')
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, tenant, stage, timeout=None):
+        """Async counterpart of slot(); a cancelled waiter gives up its place in the queue"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self.lock:
+            ticket = self._enqueue(tenant, stage, grant)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            with self.lock:
+                ticket.cancelled = True
+                granted = ticket.granted
+            if granted:
+                self._release()
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def headroom(self):
+        """Slots that are free with nothing waiting for them"""
+        with self.lock:
+            return max(0, self.slots - self.active - len(self.queue))
+
+    def stats(self):
+        with self.lock:
+            queued = [ticket for _, _, ticket in self.queue if not ticket.cancelled]
+            return {
+                'slots': self.slots,
+                'active': self.active,
+                'queued': len(queued),
+                'queued_interactive': sum(1 for ticket in queued if ticket.priority == 'interactive'),
+                'queued_bulk': sum(1 for ticket in queued if ticket.priority == 'bulk'),
+                'waiting_tenants': len({ticket.flow[0] for ticket in queued}),
+                'granted': self.granted,
+                'avg_wait_seconds': round(self.waited / self.granted, 4) if self.granted else 0.0,
+                'max_wait_seconds': round(self.max_wait, 4),
+            }
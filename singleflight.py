@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key runs the work; callers arriving while it is
+    still in flight wait for it and get the same result instead of repeating
+    the model calls. Only results that pass the shareable check are handed
+    on: when the leader fails, maybe only because of its own API key, each
+    waiter runs the work itself.
+    """
+
+    def __init__(self):
+        self.calls = {}  # key -> [threading.Event, result, exception]
+        self.tasks = {}  # key -> asyncio.Task, for the async serving mode
+        self.executed = 0
+        self.coalesced = 0
+        self.retried = 0  # Waiters that ran the work themselves after the leader failed
+        self.lock = threading.Lock()
+
+    def do(self, key, fn, shareable=None):
+        """
+        Run fn() once for every concurrent caller with the same key.
+
+        Args:
+            shareable: Optional predicate on fn's result; waiters given a
+                result it rejects, or an exception, run fn themselves
+
+        Returns:
+            The value returned by fn in the calling thread or in the thread
+            that was already running it
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = [threading.Event(), None, None]
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call[0].wait()
+            if call[2] is None and (shareable is None or shareable(call[1])):
+                return call[1]
+            self._count_retry()
+            return fn()
+
+        try:
+            call[1] = fn()
+            return call[1]
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call[0].set()
+
+    async def do_async(self, key, coro_fn, shareable=None):
+        """
+        Async counterpart of do().
+
+        The work runs in its own task and every caller awaits it shielded, so
+        a caller that is cancelled (its client went away) does not cancel the
+        result the others are waiting for.
+        """
+        with self.lock:
+            task = self.tasks.get(key)
+            leader = task is None
+            if leader:
+                task = self.tasks[key] = asyncio.ensure_future(coro_fn())
+                task.add_done_callback(lambda _: self._forget(key, task))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            return await asyncio.shield(task)
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        else:
+            if shareable is None or shareable(result):
+                return result
+        self._count_retry()
+        return await coro_fn()
+
+    def _count_retry(self):
+        with self.lock:
+            self.retried += 1
+
+    def _forget(self, key, task):
+        with self.lock:
+            if self.tasks.get(key) is task:
+                del self.tasks[key]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'in_flight': len(self.calls) + len(self.tasks),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'retried': self.retried,
+            }
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Keep the app's SQLite files out of the working tree
+_workdir = tempfile.mkdtemp(prefix='lingualens-test-')
+for _name in ('CACHE', 'LEXICON', 'JOBS', 'HISTORY'):
+    os.environ.setdefault(f'LINGUALENS_{_name}_DB', os.path.join(_workdir, f'{_name.lower()}.db'))
+os.environ.setdefault('LINGUALENS_PRELOAD_SDK', '0')
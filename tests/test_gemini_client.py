@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from gemini_client import GeminiClient
+from rate_limiter import RateLimiter
+from scheduler import FairScheduler
+
+class RateLimited(Exception):
+    code = 429
+
+    def __str__(self):
+        return '429 Quota exceeded. Please retry in 0.3s'
+
+class FlakyModel:
+    """Answers every second call with a 429, otherwise streams one chunk"""
+
+    model_name = 'models/fake'
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls % 2:
+            raise RateLimited()
+        return [SimpleNamespace(text='Grammar.')]
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls % 2:
+            raise RateLimited()
+
+        async def chunks():
+            yield SimpleNamespace(text='Grammar.')
+        return chunks()
+
+def make_client():
+    scheduler = FairScheduler(slots=1)
+    client = GeminiClient(FlakyModel(), 'key-hash', RateLimiter(rate=6000, burst=10))
+    return client, scheduler, lambda timeout: scheduler.slot('t', 'grammar', timeout)
+
+def test_stream_backs_off_without_holding_its_slot():
+    client, scheduler, slot = make_client()
+    headroom = []
+    watcher = threading.Timer(0.15, lambda: headroom.append(scheduler.headroom()))
+    watcher.start()
+    with client.stream_content('Explain', slot=slot) as response:
+        text = ''.join(chunk.text for chunk in response)
+    watcher.join()
+    assert text == 'Grammar.'
+    assert headroom == [1]
+    assert client.model.calls == 2
+
+def test_async_stream_backs_off_without_holding_its_slot():
+    async def main():
+        client, scheduler, _ = make_client()
+        slot = lambda timeout: scheduler.slot_async('t', 'grammar', timeout)
+        headroom = []
+
+        async def watch():
+            await asyncio.sleep(0.15)
+            headroom.append(scheduler.headroom())
+
+        watcher = asyncio.ensure_future(watch())
+        async with client.stream_content_async('Explain', slot=slot) as response:
+            text = ''.join([chunk.text async for chunk in response])
+        await watcher
+        assert text == 'Grammar.'
+        assert headroom == [1]
+
+    asyncio.run(main())
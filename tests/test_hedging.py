@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+from hedging import Hedger
+
+def warmed_up(**kwargs):
+    """An enabled hedger with enough fast samples for 'sentence' to hedge after min_delay"""
+    hedger = Hedger(enabled=True, min_delay=0.02, **kwargs)
+    for _ in range(hedger.min_samples):
+        hedger.observe('sentence', 0.01)
+    return hedger
+
+def test_disabled_hedger_just_calls():
+    hedger = Hedger()
+    assert hedger.call('sentence', lambda: 'done') == 'done'
+    assert hedger.stats()['calls'] == 0
+
+def test_delay_needs_samples_and_is_clamped():
+    hedger = Hedger(enabled=True, min_samples=20, min_delay=0.05, max_factor=3.0)
+    for _ in range(19):
+        hedger.observe('sentence', 0.1)
+    assert hedger.delay('sentence') is None
+    # The stall is the 95th percentile, but the delay is capped at 3x the median
+    hedger.observe('sentence', 10.0)
+    assert hedger.delay('sentence') == 0.1 * 3
+    for _ in range(200):
+        hedger.observe('romanization', 0.001)
+    assert hedger.delay('romanization') == 0.05
+
+def test_hedge_wins_over_a_stalled_call():
+    hedger = warmed_up()
+    stalled = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            stalled.wait(5)
+            return 'late'
+        return 'hedged'
+
+    try:
+        assert hedger.call('sentence', fn) == 'hedged'
+    finally:
+        stalled.set()
+    assert hedger.stats()['fired'] == 1 and hedger.stats()['won'] == 1
+    # A hedged call's duration says nothing about normal latency
+    assert len(hedger.latencies['sentence']) == hedger.min_samples
+
+def test_budget_limits_hedges():
+    hedger = warmed_up(budget=0.5)
+
+    def slow():
+        time.sleep(0.1)
+        return 'done'
+
+    for _ in range(4):
+        assert hedger.call('sentence', slow) == 'done'
+    assert hedger.stats()['calls'] == 4
+    assert hedger.stats()['fired'] == 2
+
+def test_async_hedge_cancels_the_loser():
+    async def main():
+        hedger = warmed_up()
+        calls = []
+        cancelled = []
+
+        async def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(1)
+                    raise
+            return 'hedged'
+
+        assert await hedger.call_async('sentence', fn) == 'hedged'
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+        assert hedger.stats()['won'] == 1
+
+    asyncio.run(main())
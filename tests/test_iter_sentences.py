@@ -0,0 +1,16 @@
+import app
+
+def chunked(text, size):
+    return (text[start:start + size] for start in range(0, len(text), size))
+
+def test_chunk_size_does_not_change_sentences():
+    text = ' '.join(f'This is sentence number {n} in the long book.' for n in range(5000))
+    expected = app.split_into_sentences(text, 'en')
+    assert len(expected) == 5000
+    for size in (7, 100, 4096, 65536):
+        assert list(app.iter_sentences(chunked(text, size), 'en')) == expected
+
+def test_text_without_breaks_is_flushed():
+    text = 'word ' * 10000
+    sentences = list(app.iter_sentences(chunked(text, 65536), 'en'))
+    assert ''.join(sentences).split() == text.split()
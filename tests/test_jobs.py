@@ -0,0 +1,109 @@
+import hashlib
+import io
+import time
+
+import pytest
+
+import app
+from benchmarks.corpora import build_text
+from benchmarks.fake_gemini import FakeGeminiModel
+from rate_limiter import RateLimiter
+from result_cache import ResultCache
+
+BAD_KEY = 'bad-key'
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """A logged-in test client whose model calls go to the fake backend; BAD_KEY fails every call"""
+    def model_factory(model_name, key_hash):
+        if key_hash == hashlib.sha256(BAD_KEY.encode('utf-8')).hexdigest():
+            return FakeGeminiModel(model_name, latency=0.0, error_rate=1.0, seed=1)
+        return FakeGeminiModel(model_name, latency=0.0, malformed_rate=0.0, missing_word_rate=0.0, seed=1)
+
+    monkeypatch.setattr(app.gemini_clients, 'model_factory', model_factory)
+    monkeypatch.setattr(app.gemini_clients, 'limiter', RateLimiter(rate=100000, max_rate=100000, burst=1000))
+    monkeypatch.setattr(app.gemini_clients, 'clients', {})
+    monkeypatch.setattr(app, 'JSON_RETRIES', 0)
+    # Each test translates its sentences afresh
+    monkeypatch.setattr(app, 'sentence_cache', ResultCache(str(tmp_path / 'cache.db'), table='sentences'))
+    test_client = app.app.test_client()
+    with test_client.session_transaction() as session:
+        session['verified_email'] = 'reader@example.com'
+    return test_client
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] not in app.UNFINISHED_JOB_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'Job {job_id} did not stop: {job}')
+
+def results(client, job_id):
+    return client.get(f'/jobs/{job_id}/results?limit=1000').get_json()['results']
+
+def test_job_runs_to_done(client):
+    response = client.post('/jobs', json={'text': build_text('fr', 20), 'apiKey': 'good-key'})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()['id'])
+    assert job['status'] == 'done' and job['done'] == job['total'] == 20
+    assert all(result is not None for result in results(client, job['id']))
+
+def test_failed_page_pauses_and_resume_finishes(client):
+    job_id = client.post('/jobs', json={'text': build_text('fr', 10), 'apiKey': BAD_KEY}).get_json()['id']
+    job = wait_for_job(client, job_id)
+    assert job['status'] == 'paused' and job['done'] == 0
+    assert client.post(f'/jobs/{job_id}/resume', json={'apiKey': 'good-key'}).status_code == 202
+    job = wait_for_job(client, job_id)
+    assert job['status'] == 'done' and job['done'] == 10
+
+def test_restart_pauses_running_jobs_for_resume(client):
+    job_id = app.job_store.create('reader@example.com', 'fr', 'en', 1)
+    app.job_store.add_sentences(job_id, 0, ['Bonjour.', 'Merci.'])
+    app.job_store.mark_segmented(job_id)
+    app.job_store.set_status(job_id, 'running')
+    app.job_store.pause_unfinished()
+    assert app.job_store.get(job_id)['status'] == 'paused'
+    assert client.post(f'/jobs/{job_id}/resume', json={'apiKey': 'good-key'}).status_code == 202
+    assert wait_for_job(client, job_id)['status'] == 'done'
+
+def test_interrupted_segmentation_cannot_be_resumed(client):
+    job_id = app.job_store.create('reader@example.com', 'fr', 'en', 1)
+    app.job_store.add_sentences(job_id, 0, ['Bonjour.'])
+    app.job_store.pause_unfinished()
+    assert app.job_store.get(job_id)['status'] == 'failed'
+    assert client.post(f'/jobs/{job_id}/resume', json={'apiKey': 'good-key'}).status_code == 409
+
+class BrokenUpload(io.RawIOBase):
+    """An upload whose client goes away after the first read"""
+
+    def __init__(self):
+        self.reads = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.reads += 1
+        if self.reads > 1:
+            raise OSError('Client disconnected')
+        buffer[:4] = b'Hi. '
+        return 4
+
+def test_broken_upload_leaves_no_job(client):
+    jobs_before = app.job_store.stats()['jobs']
+    with pytest.raises(OSError):
+        client.post('/jobs', data={'apiKey': 'good-key', 'file': (io.BufferedReader(BrokenUpload()), 'book.txt')})
+    assert app.job_store.stats()['jobs'] == jobs_before
+
+def test_too_long_upload_leaves_no_job(client, monkeypatch):
+    monkeypatch.setattr(app, 'JOB_MAX_CHARS', 100)
+    jobs_before = app.job_store.stats()['jobs']
+    response = client.post('/jobs', json={'text': build_text('fr', 20), 'apiKey': 'good-key'})
+    assert response.status_code == 413
+    assert app.job_store.stats()['jobs'] == jobs_before
+
+def test_upload_decoding_keeps_split_and_truncated_characters():
+    data = 'héé'.encode('utf-8') + b'\xc3'
+    assert ''.join(app.decode_upload(io.BytesIO(data), chunk_size=2)) == 'héé�'
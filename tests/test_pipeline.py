@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+import app
+
+def worker(n):
+    if n == 2:
+        raise RuntimeError('boom')
+    time.sleep(0.05)
+    return n
+
+async def async_worker(n):
+    if n == 2:
+        raise RuntimeError('boom')
+    await asyncio.sleep(0.05)
+    return n
+
+def recorder():
+    calls = []
+    hooks = dict(on_cancel=lambda skipped: calls.append('cancel'),
+                 on_error=lambda error, skipped: calls.append(f'error: {error}'))
+    return calls, hooks
+
+def test_worker_error_is_not_a_cancellation():
+    calls, hooks = recorder()
+    with pytest.raises(RuntimeError):
+        list(app.run_sentence_pipeline(list(range(10)), worker, 2, **hooks))
+    assert calls == ['error: boom']
+
+def test_closing_early_is_a_cancellation():
+    calls, hooks = recorder()
+    pipeline = app.run_sentence_pipeline(list(range(10)), worker, 2, **hooks)
+    assert next(pipeline) == (0, 0)
+    pipeline.close()
+    assert calls == ['cancel']
+
+def test_async_pipeline_tells_errors_from_cancellations():
+    pytest.importorskip('quart')
+    import asgi
+
+    async def main():
+        calls, hooks = recorder()
+        with pytest.raises(RuntimeError):
+            async for _ in asgi.run_sentence_pipeline(list(range(10)), async_worker, 2, **hooks):
+                pass
+        assert calls == ['error: boom']
+
+        calls, hooks = recorder()
+        pipeline = asgi.run_sentence_pipeline(list(range(10)), async_worker, 2, **hooks)
+        assert await pipeline.__anext__() == (0, 0)
+        await pipeline.aclose()
+        assert calls == ['cancel']
+
+    asyncio.run(main())
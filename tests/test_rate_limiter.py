@@ -0,0 +1,52 @@
+import time
+
+from rate_limiter import TokenBucket, RateLimiter
+
+def test_burst_then_refill_rate():
+    bucket = TokenBucket(rate=60, burst=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    wait = bucket.try_acquire()
+    assert 0.9 < wait <= 1.0
+    assert not bucket.acquire(timeout=0.05)
+
+def test_rate_limit_halves_rate_and_blocks():
+    bucket = TokenBucket(rate=30, max_rate=60, min_rate=10, burst=4)
+    blocked_for = bucket.on_rate_limited(retry_after=5)
+    assert 4.9 < blocked_for <= 5
+    assert bucket.stats()['rate_per_minute'] == 15
+    assert bucket.available() == 0
+    assert bucket.try_acquire() >= 4.9
+    # Halving stops at min_rate, and a missing hint backs off exponentially
+    assert bucket.on_rate_limited() > 5
+    assert bucket.stats()['rate_per_minute'] == 10
+
+def test_success_raises_rate_up_to_max():
+    bucket = TokenBucket(rate=58, max_rate=60)
+    bucket.on_success()
+    assert bucket.stats()['rate_per_minute'] == 59
+    for _ in range(5):
+        bucket.on_success()
+    assert bucket.stats()['rate_per_minute'] == 60
+
+def test_limiter_shares_bucket_per_key():
+    limiter = RateLimiter()
+    assert limiter.bucket('a') is limiter.bucket('a')
+    assert limiter.bucket('a') is not limiter.bucket('b')
+
+def test_limiter_evicts_least_recently_used_but_keeps_backoff():
+    limiter = RateLimiter(max_keys=2)
+    limiter.bucket('blocked').on_rate_limited(retry_after=60)
+    time.sleep(0.01)
+    limiter.bucket('old').try_acquire()
+    limiter.bucket('new')
+    assert set(limiter.buckets) == {'blocked', 'new'}
+    assert limiter.stats() == {'keys': 2, 'evicted': 1}
+
+def test_limiter_drops_idle_buckets():
+    limiter = RateLimiter(idle_timeout=0.01)
+    limiter.bucket('a')
+    limiter.bucket('b').on_rate_limited(retry_after=60)
+    time.sleep(0.02)
+    limiter.bucket('c')
+    assert set(limiter.buckets) == {'b', 'c'}
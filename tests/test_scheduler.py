@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from scheduler import FairScheduler
+
+def grant_order(scheduler, requests):
+    """Queue (tenant, stage) requests behind one holding the only slot, then release them one by one"""
+    order = []
+    with scheduler.lock:
+        scheduler._enqueue('holder', 'sentence', lambda: None)
+        for tenant, stage in requests:
+            scheduler._enqueue(tenant, stage, lambda name=f'{tenant}:{stage}': order.append(name))
+    for _ in range(len(requests) + 1):
+        scheduler._release()
+    return order
+
+def test_newcomer_goes_before_a_backlog():
+    order = grant_order(FairScheduler(slots=1), [('a', 'sentence')] * 3 + [('b', 'sentence')])
+    assert order == ['a:sentence', 'b:sentence', 'a:sentence', 'a:sentence']
+
+def test_grammar_clicks_go_before_bulk_work():
+    order = grant_order(FairScheduler(slots=1), [('a', 'sentence')] * 3 + [('b', 'grammar')] * 2)
+    assert order == ['a:sentence', 'b:grammar', 'b:grammar', 'a:sentence', 'a:sentence']
+
+def test_prefetch_waits_behind_bulk_work():
+    order = grant_order(FairScheduler(slots=1), [('a', 'grammar_prefetch')] * 2 + [('a', 'sentence')] * 2)
+    assert order == ['a:grammar_prefetch', 'a:sentence', 'a:sentence', 'a:grammar_prefetch']
+
+def test_slot_times_out_and_gives_up_its_place():
+    scheduler = FairScheduler(slots=1)
+    with scheduler.slot('a', 'sentence'):
+        assert scheduler.headroom() == 0
+        with pytest.raises(TimeoutError):
+            with scheduler.slot('b', 'sentence', timeout=0.05):
+                pass
+        assert scheduler.stats()['queued'] == 0
+    assert scheduler.headroom() == 1
+    assert scheduler.stats()['active'] == 0
+
+def test_async_slot_times_out_and_gives_up_its_place():
+    async def main():
+        scheduler = FairScheduler(slots=1)
+        async with scheduler.slot_async('a', 'sentence'):
+            with pytest.raises(asyncio.TimeoutError):
+                async with scheduler.slot_async('b', 'sentence', timeout=0.05):
+                    pass
+        assert scheduler.headroom() == 1
+        async with scheduler.slot_async('b', 'sentence', timeout=0.05):
+            assert scheduler.stats()['active'] == 1
+
+    asyncio.run(main())
+
+def test_headroom_counts_free_slots_without_waiters():
+    scheduler = FairScheduler(slots=2)
+    assert scheduler.headroom() == 2
+    with scheduler.slot('a', 'sentence'):
+        assert scheduler.headroom() == 1
+        with scheduler.slot('b', 'grammar'):
+            assert scheduler.headroom() == 0
+    assert scheduler.stats()['granted'] == 2
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+from singleflight import SingleFlight
+
+def run_coalesced(flight, fn, waiters=3, shareable=None):
+    """Start a leader and `waiters` callers that join it while fn blocks; return their results"""
+    release = threading.Event()
+    results = []
+
+    def blocking():
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            results.append(flight.do('key', blocking, shareable))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(waiters + 1)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()['coalesced'] < waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    calls = []
+    results = run_coalesced(flight, lambda: calls.append(1) or 'done')
+    assert results == ['done'] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'executed': 1, 'coalesced': 3, 'retried': 0}
+
+def test_waiters_retry_when_the_leader_fails():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('bad key')
+        return 'done'
+
+    results = run_coalesced(flight, fn)
+    assert sorted(map(str, results)) == ['bad key', 'done', 'done', 'done']
+    assert len(calls) == 4
+    assert flight.stats()['retried'] == 3
+
+def test_unshareable_results_are_not_handed_on():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        # The leader's result is one that must not be shared, e.g. an error placeholder
+        return None if len(calls) == 1 else 'done'
+
+    results = run_coalesced(flight, fn, shareable=lambda result: result is not None)
+    assert sorted(results, key=str) == [None, 'done', 'done', 'done']
+    assert flight.stats()['retried'] == 3
+
+def test_async_cancelled_waiter_does_not_cancel_the_work():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return 'done'
+
+        leader = asyncio.ensure_future(flight.do_async('key', work))
+        waiter = asyncio.ensure_future(flight.do_async('key', work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        assert await leader == 'done'
+        assert waiter.cancelled()
+        assert len(calls) == 1
+        assert flight.stats() == {'in_flight': 0, 'executed': 1, 'coalesced': 1, 'retried': 0}
+
+    asyncio.run(main())
+
+def test_async_waiters_retry_when_the_leader_fails():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            if len(calls) == 1:
+                raise RuntimeError('bad key')
+            return 'done'
+
+        results = await asyncio.gather(*(flight.do_async('key', work) for _ in range(3)), return_exceptions=True)
+        assert list(map(str, results)) == ['bad key', 'done', 'done']
+        assert flight.stats()['retried'] == 2
+
+    asyncio.run(main())
@@ -0,0 +1,299 @@
+"""
+Table-driven romanization for scripts that can be romanized by rule.
+
+Covers Cyrillic (Russian, Ukrainian, Belarusian, Bulgarian, Serbian,
+Macedonian), Greek, Georgian, Armenian and kana-only Japanese. Scripts that
+need a dictionary or context to read (Chinese, kanji, Thai, Arabic, ...) are
+left to the model: romanize() returns None for them.
+"""
+import unicodedata
+
+# The soft sign and the Georgian ejective / Armenian aspirate mark are written
+# with modifier letters, not an ASCII apostrophe, so that they stay part of the
+# word when punctuation is stripped from around it
+MODIFIER_LETTERS = 'ʹʼ'  # U+02B9 MODIFIER LETTER PRIME, U+02BC MODIFIER LETTER APOSTROPHE
+
+# Russian, BGN/PCGN without diacritics; the other Cyrillic tables start from it
+RUSSIAN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': 'ʹ', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+}
+RUSSIAN_INITIAL = {'е': 'ye', 'ё': 'yo'}
+
+# Ukrainian national system (2010); the apostrophe and soft sign are dropped
+UKRAINIAN = dict(RUSSIAN, **{
+    'г': 'h', 'ґ': 'g', 'е': 'e', 'є': 'ie', 'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i',
+    'х': 'kh', 'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', "'": '', '’': '', 'ʼ': '',
+})
+UKRAINIAN_INITIAL = {'є': 'ye', 'ї': 'yi', 'й': 'y', 'ю': 'yu', 'я': 'ya'}
+
+# Belarusian national system (2007) without diacritics
+BELARUSIAN = dict(RUSSIAN, **{
+    'г': 'h', 'е': 'ie', 'ё': 'io', 'і': 'i', 'й': 'j', 'ў': 'u', 'х': 'ch', 'ц': 'c',
+    'ч': 'ch', 'ш': 'sh', 'ь': 'ʹ', 'ю': 'iu', 'я': 'ia', "'": '', '’': '',
+})
+
+# Bulgarian streamlined system (2009)
+BULGARIAN = dict(RUSSIAN, **{
+    'ж': 'zh', 'й': 'y', 'х': 'h', 'ц': 'ts', 'щ': 'sht', 'ъ': 'a', 'ь': 'y', 'ю': 'yu', 'я': 'ya',
+})
+
+# Serbian Latin alphabet: an exact one-to-one counterpart of the Cyrillic one
+SERBIAN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'đ', 'е': 'e', 'ж': 'ž',
+    'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj', 'м': 'm', 'н': 'n',
+    'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ћ': 'ć', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'č', 'џ': 'dž', 'ш': 'š',
+}
+
+# Macedonian official Latin transliteration
+MACEDONIAN = dict(SERBIAN, **{'ѓ': 'gj', 'ѕ': 'dz', 'ќ': 'kj'})
+
+# Greek, ELOT 743 (the basis of UN and BGN/PCGN); accents are dropped
+GREEK = {
+    'α': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'i', 'θ': 'th',
+    'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p',
+    'ρ': 'r', 'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y', 'φ': 'f', 'χ': 'ch', 'ψ': 'ps',
+    'ω': 'o', ';': '?', '·': ';',
+}
+GREEK_DIGRAPHS = {'ου': 'ou', 'γγ': 'ng', 'γκ': 'gk', 'γξ': 'nx', 'γχ': 'nch'}
+GREEK_WORD_INITIAL = {'μπ': 'b', 'ντ': 'd'}
+GREEK_MEDIAL = {'μπ': 'mp', 'ντ': 'nt'}
+# αυ, ευ and ηυ are read with v before vowels and voiced consonants, f otherwise
+GREEK_U_DIPHTHONGS = {'α': 'a', 'ε': 'e', 'η': 'i'}
+GREEK_VOICELESS = set('θκξπστφχψ')
+
+# Georgian national system (2002)
+GEORGIAN = {
+    'ა': 'a', 'ბ': 'b', 'გ': 'g', 'დ': 'd', 'ე': 'e', 'ვ': 'v', 'ზ': 'z', 'თ': 't',
+    'ი': 'i', 'კ': 'kʼ', 'ლ': 'l', 'მ': 'm', 'ნ': 'n', 'ო': 'o', 'პ': 'pʼ', 'ჟ': 'zh',
+    'რ': 'r', 'ს': 's', 'ტ': 'tʼ', 'უ': 'u', 'ფ': 'p', 'ქ': 'k', 'ღ': 'gh', 'ყ': 'qʼ',
+    'შ': 'sh', 'ჩ': 'ch', 'ც': 'ts', 'ძ': 'dz', 'წ': 'tsʼ', 'ჭ': 'chʼ', 'ხ': 'kh', 'ჯ': 'j',
+    'ჰ': 'h',
+}
+
+# Eastern Armenian, BGN/PCGN (1981)
+ARMENIAN = {
+    'ա': 'a', 'բ': 'b', 'գ': 'g', 'դ': 'd', 'ե': 'e', 'զ': 'z', 'է': 'e', 'ը': 'y',
+    'թ': 'tʼ', 'ժ': 'zh', 'ի': 'i', 'լ': 'l', 'խ': 'kh', 'ծ': 'ts', 'կ': 'k', 'հ': 'h',
+    'ձ': 'dz', 'ղ': 'gh', 'ճ': 'ch', 'մ': 'm', 'յ': 'y', 'ն': 'n', 'շ': 'sh', 'ո': 'o',
+    'չ': 'chʼ', 'պ': 'p', 'ջ': 'j', 'ռ': 'r', 'ս': 's', 'վ': 'v', 'տ': 't', 'ր': 'r',
+    'ց': 'tsʼ', 'ւ': 'w', 'փ': 'pʼ', 'ք': 'kʼ', 'օ': 'o', 'ֆ': 'f', 'և': 'ev',
+    '։': '.', '՞': '', '՜': '', '՛': '', '՝': ',',
+}
+ARMENIAN_DIGRAPHS = {'ու': 'u'}
+ARMENIAN_INITIAL = {'ե': 'ye', 'ո': 'vo'}
+
+# Japanese kana, modified Hepburn. Katakana is folded onto hiragana first.
+KANA = {
+    'あ': 'a', 'い': 'i', 'う': 'u', 'え': 'e', 'お': 'o',
+    'か': 'ka', 'き': 'ki', 'く': 'ku', 'け': 'ke', 'こ': 'ko',
+    'が': 'ga', 'ぎ': 'gi', 'ぐ': 'gu', 'げ': 'ge', 'ご': 'go',
+    'さ': 'sa', 'し': 'shi', 'す': 'su', 'せ': 'se', 'そ': 'so',
+    'ざ': 'za', 'じ': 'ji', 'ず': 'zu', 'ぜ': 'ze', 'ぞ': 'zo',
+    'た': 'ta', 'ち': 'chi', 'つ': 'tsu', 'て': 'te', 'と': 'to',
+    'だ': 'da', 'ぢ': 'ji', 'づ': 'zu', 'で': 'de', 'ど': 'do',
+    'な': 'na', 'に': 'ni', 'ぬ': 'nu', 'ね': 'ne', 'の': 'no',
+    'は': 'ha', 'ひ': 'hi', 'ふ': 'fu', 'へ': 'he', 'ほ': 'ho',
+    'ば': 'ba', 'び': 'bi', 'ぶ': 'bu', 'べ': 'be', 'ぼ': 'bo',
+    'ぱ': 'pa', 'ぴ': 'pi', 'ぷ': 'pu', 'ぺ': 'pe', 'ぽ': 'po',
+    'ま': 'ma', 'み': 'mi', 'む': 'mu', 'め': 'me', 'も': 'mo',
+    'や': 'ya', 'ゆ': 'yu', 'よ': 'yo',
+    'ら': 'ra', 'り': 'ri', 'る': 'ru', 'れ': 're', 'ろ': 'ro',
+    'わ': 'wa', 'ゐ': 'i', 'ゑ': 'e', 'を': 'o', 'ん': 'n', 'ゔ': 'vu',
+    'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o', 'ゎ': 'wa',
+    '。': '.', '、': ',', '！': '!', '？': '?', '「': '"', '」': '"', '・': ' ', '　': ' ',
+}
+KANA_DIGRAPHS = {
+    'きゃ': 'kya', 'きゅ': 'kyu', 'きょ': 'kyo', 'ぎゃ': 'gya', 'ぎゅ': 'gyu', 'ぎょ': 'gyo',
+    'しゃ': 'sha', 'しゅ': 'shu', 'しょ': 'sho', 'じゃ': 'ja', 'じゅ': 'ju', 'じょ': 'jo',
+    'ちゃ': 'cha', 'ちゅ': 'chu', 'ちょ': 'cho', 'ぢゃ': 'ja', 'ぢゅ': 'ju', 'ぢょ': 'jo',
+    'にゃ': 'nya', 'にゅ': 'nyu', 'にょ': 'nyo', 'ひゃ': 'hya', 'ひゅ': 'hyu', 'ひょ': 'hyo',
+    'びゃ': 'bya', 'びゅ': 'byu', 'びょ': 'byo', 'ぴゃ': 'pya', 'ぴゅ': 'pyu', 'ぴょ': 'pyo',
+    'みゃ': 'mya', 'みゅ': 'myu', 'みょ': 'myo', 'りゃ': 'rya', 'りゅ': 'ryu', 'りょ': 'ryo',
+    'しぇ': 'she', 'じぇ': 'je', 'ちぇ': 'che', 'てぃ': 'ti', 'でぃ': 'di', 'とぅ': 'tu',
+    'ふぁ': 'fa', 'ふぃ': 'fi', 'ふぇ': 'fe', 'ふぉ': 'fo', 'うぃ': 'wi', 'うぇ': 'we',
+    'うぉ': 'wo', 'ゔぁ': 'va', 'ゔぃ': 'vi', 'ゔぇ': 've', 'ゔぉ': 'vo',
+}
+# In text written with spaces between phrases (as kana-only text usually is),
+# a phrase-final は or へ is the topic or direction particle
+KANA_PARTICLES = {'は': 'wa', 'へ': 'e'}
+
+# Apostrophes inside a word (Ukrainian об’єкт) do not start a new word
+APOSTROPHES = "'’ʼ"
+
+CYRILLIC_TABLES = {
+    'ru': RUSSIAN,
+    'uk': UKRAINIAN,
+    'be': BELARUSIAN,
+    'bg': BULGARIAN,
+    'sr': SERBIAN,
+    'mk': MACEDONIAN,
+}
+
+def supports(lang_code):
+    """Whether lang_code has a rule-based romanization"""
+    return lang_code in CYRILLIC_TABLES or lang_code in ROMANIZERS
+
+def romanize(text, lang_code):
+    """
+    Romanize text locally using the standard scheme for its language.
+
+    Args:
+        text: The sentence to romanize
+        lang_code: The ISO 639-1 source language code
+
+    Returns:
+        str: The romanized text, or None when the language or some character
+        in the text cannot be romanized by rule and the model is needed
+    """
+    text = unicodedata.normalize('NFC', text)
+    if lang_code in CYRILLIC_TABLES:
+        result = romanize_cyrillic(text, lang_code)
+    elif lang_code in ROMANIZERS:
+        result = ROMANIZERS[lang_code](text)
+    else:
+        return None
+    # Anything left over that is still a letter of another script means the
+    # tables did not cover this text (e.g. kanji in a Japanese sentence)
+    if result is None or any(ch.isalpha() and not is_latin(ch) for ch in result):
+        return None
+    return result
+
+def is_latin(ch):
+    return ch.isascii() or ch in MODIFIER_LETTERS or unicodedata.name(ch, '').startswith('LATIN')
+
+def match_case(text, i, romanized):
+    """Carry the case of text[i] over to its romanization"""
+    if not text[i].isupper():
+        return romanized
+    # In an all-caps word a digraph stays all caps (ЩИ -> SHCHI, Щи -> Shchi)
+    neighbours = text[max(0, i - 1):i] + text[i + 1:i + 2]
+    if any(ch.isupper() for ch in neighbours):
+        return romanized.upper()
+    return romanized.capitalize()
+
+def transliterate(text, table, initial=None, digraphs=None, initial_after=''):
+    """
+    Romanize text with a character table, keeping the case of each letter.
+
+    Args:
+        text: The text to romanize
+        table: Lowercase source character -> romanization
+        initial: Forms used at the start of a word (or after initial_after)
+        digraphs: Two-character sequences with their own romanization
+        initial_after: Lowercase characters after which initial forms apply
+    """
+    out = []
+    i = 0
+    while i < len(text):
+        pair = text[i:i + 2].lower()
+        if digraphs and pair in digraphs:
+            out.append(match_case(text, i, digraphs[pair]))
+            i += 2
+            continue
+        lower = text[i].lower()
+        previous = text[i - 1].lower() if i else ''
+        word_start = not previous.isalpha() and previous not in APOSTROPHES
+        if initial and lower in initial and (word_start or previous in initial_after):
+            out.append(match_case(text, i, initial[lower]))
+        else:
+            out.append(match_case(text, i, table.get(lower, text[i])))
+        i += 1
+    return ''.join(out)
+
+def romanize_cyrillic(text, lang_code):
+    if lang_code == 'ru':
+        # е and ё are ye and yo at the start of a word and after a vowel or sign
+        return transliterate(text, RUSSIAN, RUSSIAN_INITIAL, initial_after='аеёиоуыэюяйъь')
+    if lang_code == 'uk':
+        # зг is written zgh so it is not read as the digraph zh
+        return transliterate(text, UKRAINIAN, UKRAINIAN_INITIAL, {'зг': 'zgh'})
+    return transliterate(text, CYRILLIC_TABLES[lang_code])
+
+def romanize_greek(text):
+    # Accents are dropped, but a diaeresis splits a would-be diphthong (αϊ, αϋ),
+    # so it is kept as a separator until the letters are romanized
+    plain = ''.join('\x00' if ch == '\u0308' else ch
+                    for ch in unicodedata.normalize('NFD', text)
+                    if ch == '\u0308' or not unicodedata.combining(ch))
+    plain = unicodedata.normalize('NFC', plain)
+    out = []
+    i = 0
+    while i < len(plain):
+        if plain[i] == '\x00':
+            i += 1
+            continue
+        pair = plain[i:i + 2].lower()
+        following = plain[i + 2].lower() if i + 2 < len(plain) else ''
+        word_start = i == 0 or not plain[i - 1].isalpha()
+        if pair in GREEK_DIGRAPHS:
+            out.append(match_case(plain, i, GREEK_DIGRAPHS[pair]))
+            i += 2
+        elif pair in GREEK_WORD_INITIAL:
+            out.append(match_case(plain, i, (GREEK_WORD_INITIAL if word_start else GREEK_MEDIAL)[pair]))
+            i += 2
+        elif len(pair) == 2 and pair[0] in GREEK_U_DIPHTHONGS and pair[1] == 'υ':
+            voiced = following.isalpha() and following not in GREEK_VOICELESS
+            out.append(match_case(plain, i, GREEK_U_DIPHTHONGS[pair[0]] + ('v' if voiced else 'f')))
+            i += 2
+        else:
+            out.append(match_case(plain, i, GREEK.get(pair[:1], plain[i])))
+            i += 1
+    return ''.join(out)
+
+def romanize_georgian(text):
+    # Georgian has no letter case
+    return ''.join(GEORGIAN.get(ch, ch) for ch in text)
+
+def romanize_armenian(text):
+    # ու is a single vowel; ե and ո gain a glide at the start of a word
+    return transliterate(text, ARMENIAN, ARMENIAN_INITIAL, ARMENIAN_DIGRAPHS)
+
+def romanize_kana(text):
+    # Katakana to hiragana, so one table serves both
+    folded = ''.join(chr(ord(ch) - 0x60) if 'ァ' <= ch <= 'ヶ' else ch for ch in text)
+    out = []
+    i = 0
+    while i < len(folded):
+        ch = folded[i]
+        pair = folded[i:i + 2]
+        phrase_end = i + 1 == len(folded) or folded[i + 1] in ' 　。、！？'
+        phrase_start = i == 0 or folded[i - 1] in ' 　'
+        if pair in KANA_DIGRAPHS:
+            out.append(KANA_DIGRAPHS[pair])
+            i += 2
+        elif ch in ('っ', 'ッ'):
+            # Small tsu doubles the next consonant (tch for ch)
+            following = romanize_kana(folded[i + 1:i + 3]) or ''
+            if following.startswith('ch'):
+                out.append('t')
+            elif following[:1].isalpha() and following[:1] not in 'aeiou':
+                out.append(following[0])
+            i += 1
+        elif ch == 'ー':
+            # The long vowel mark repeats the previous vowel
+            previous = ''.join(out)
+            out.append(previous[-1] if previous and previous[-1] in 'aeiou' else '')
+            i += 1
+        elif ch == 'ん':
+            following = romanize_kana(folded[i + 1:i + 2]) if i + 1 < len(folded) else ''
+            out.append("n'" if following[:1] in tuple('aeiouy') and following else 'n')
+            i += 1
+        elif ch in KANA_PARTICLES and phrase_end and not phrase_start:
+            out.append(KANA_PARTICLES[ch])
+            i += 1
+        else:
+            out.append(KANA.get(ch, ch))
+            i += 1
+    return ''.join(out)
+
+ROMANIZERS = {
+    'el': romanize_greek,
+    'ka': romanize_georgian,
+    'hy': romanize_armenian,
+    'ja': romanize_kana,
+}